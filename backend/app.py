@@ -1,16 +1,30 @@
-from fastapi import FastAPI, HTTPException, Request
-from pydantic import BaseModel
+from fastapi import FastAPI, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, Field, ValidationError
 from fastapi.middleware.cors import CORSMiddleware
 import httpx
-from .local_nlp import detect_intent_local as detect_intent, load_intents
-import discord
-from discord.ext import commands
+from . import local_nlp
+from .context_store import ContextStore
+from .local_nlp import RESPONSE_CACHE
+from .logging_setup import configure_logging, elapsed_ms
+from .metrics import Gauge, REQUEST_LATENCY, REQUESTS, RULE_HITS, SEND_LATENCY, render_metrics, write_snapshot
+from .nlp_executor import DetectionExecutor, ExecutorSaturated
+from .outbound import DISCORD_MESSAGE_LIMIT, OutboundScheduler, pack_fragments
+from .process_lock import ProcessLock, ReloadMarker
+from .static_assets import PrecompressedStaticFiles, asset_response, build_static_assets
+from .telegram_queue import WEBHOOK_MODES, QueueFull, UpdateQueue
 import asyncio
-import threading
 from dotenv import load_dotenv
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+import json
+import logging
 import os
+import secrets
+import time
+from typing import Dict, List, Optional
+
+configure_logging()
+logger = logging.getLogger("kianoland.app")
 
 # 🚀 Initialize FastAPI
 app = FastAPI()
@@ -18,14 +32,28 @@ app = FastAPI()
 # Menentukan path absolut ke direktori frontend
 frontend_dir = os.path.join(os.path.dirname(__file__), "..", "frontend")
 
-# Mount direktori frontend sebagai file statis
-# Pastikan path ini benar: /static akan menunjuk ke folder 'frontend' Anda
-app.mount("/static", StaticFiles(directory=frontend_dir), name="static")
-
-# Endpoint untuk menyajikan index.html dari root
-@app.get("/")
-async def serve_index():
-    return FileResponse(os.path.join(frontend_dir, "index.html"))
+# STATIC_MODE=memory (default): semua file frontend dibaca & dikompresi (gzip/brotli) sekali saat
+# start lalu disajikan dari memori dengan ETag + URL berversi (cache immutable).
+# STATIC_MODE=files: langsung dari disk (berguna saat mengedit frontend tanpa restart).
+STATIC_MODE = os.getenv("STATIC_MODE", "memory").lower()
+
+if STATIC_MODE == "files":
+    # Mount direktori frontend sebagai file statis
+    # Pastikan path ini benar: /static akan menunjuk ke folder 'frontend' Anda
+    app.mount("/static", StaticFiles(directory=frontend_dir), name="static")
+
+    # Endpoint untuk menyajikan index.html dari root
+    @app.get("/")
+    async def serve_index():
+        return FileResponse(os.path.join(frontend_dir, "index.html"))
+else:
+    static_assets = build_static_assets(frontend_dir)
+    app.mount("/static", PrecompressedStaticFiles(static_assets), name="static")
+
+    # index.html selalu direvalidasi (ETag) karena berisi URL aset berversi
+    @app.api_route("/", methods=["GET", "HEAD"])
+    async def serve_index(request: Request):
+        return asset_response(static_assets["index.html"], request.headers, method=request.method)
 
 app.add_middleware(
     CORSMiddleware,
@@ -44,40 +72,187 @@ app.add_middleware(
 # 🛠️ Configurations from .env
 load_dotenv()
 
-DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
-if not DISCORD_TOKEN:
-    raise ValueError("FATAL ERROR: DISCORD_TOKEN is not set!")
+def integration_enabled(name: str, required: List[str]) -> bool:
+    """ENABLE_<NAME>=true|false|auto (default auto: aktif bila semua variabel wajibnya di-set).
+
+    Dengan integrasi dimatikan, proses hanya melayani API web (/chat) sehingga replika web
+    bisa diskalakan terpisah dari satu proses bot.
+    """
+    value = os.getenv(f"ENABLE_{name}", "auto").lower()
+    missing = [var for var in required if not os.getenv(var)]
+    if value in ("0", "false", "no", "off"):
+        return False
+    if value == "auto":
+        if missing:
+            logger.warning("%s integration disabled: %s not set", name.title(), ", ".join(missing))
+        return not missing
+    if missing:
+        raise ValueError(f"FATAL ERROR: ENABLE_{name}={value} but {', '.join(missing)} is not set!")
+    return True
+
+ENABLE_DISCORD = integration_enabled("DISCORD", ["DISCORD_TOKEN", "DEDICATED_CHANNEL_ID"])
+ENABLE_TELEGRAM = integration_enabled("TELEGRAM", ["TELEGRAM_TOKEN", "TELEGRAM_WEBHOOK_URL"])
 
+DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
+DEDICATED_CHANNEL_ID = int(os.getenv("DEDICATED_CHANNEL_ID") or 0)
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
-if not TELEGRAM_TOKEN:
-    raise ValueError("FATAL ERROR: TELEGRAM_TOKEN is not set!")
+TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL")
 
-dedicated_channel_id_str = os.getenv("DEDICATED_CHANNEL_ID")
-if not dedicated_channel_id_str:
-    raise ValueError("FATAL ERROR: DEDICATED_CHANNEL_ID is not set!")
-DEDICATED_CHANNEL_ID = int(dedicated_channel_id_str)
+# Base URL Bot API bisa diarahkan ke server lokal (stand-in) untuk pengujian
+DISCORD_API_BASE = os.getenv("DISCORD_API_BASE", "https://discord.com/api/v10").rstrip("/")
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org").rstrip("/")
+TELEGRAM_API_URL = f"{TELEGRAM_API_BASE}/bot{TELEGRAM_TOKEN}"
+
+# Deteksi intent dijalankan di luar event loop (NLP_EXECUTOR=inline|thread|process)
+nlp_executor = DetectionExecutor.from_env()
+
+Gauge("kianoland_executor_pending", "Deteksi yang sedang antre/berjalan di executor", lambda: nlp_executor.pending)
+Gauge("kianoland_response_cache_size", "Jumlah entri di cache respons", lambda: RESPONSE_CACHE.stats()["size"])
+Gauge("kianoland_response_cache_hit_ratio", "Rasio cache hit sejak start", lambda: RESPONSE_CACHE.stats()["hit_rate"])
+
+def record_detection(channel: str, detection, started: float):
+    """Satu record log + metrik per request: channel, aturan yang terpicu, intent dan durasi"""
+    seconds = time.perf_counter() - started
+    REQUESTS.inc(channel)
+    RULE_HITS.inc(detection.rule)
+    REQUEST_LATENCY.observe(seconds, channel)
+    fields = {"channel": channel, "rule": detection.rule, "intent": detection.intent, "ms": round(seconds * 1000, 3)}
+    if detection.corrections:
+        # Entitas hasil koreksi salah ketik beserta confidence-nya
+        fields["corrections"] = [correction._asdict() for correction in detection.corrections]
+    logger.info("intent detected", extra={"fields": fields})
+
+# Konteks percakapan per sesi (proyek/tipe/lokasi terakhir) agar pertanyaan lanjutan seperti
+# "lokasinya?" tidak perlu ditanya ulang "proyek yang mana"
+CONTEXT_STORE = ContextStore(
+    max_size=int(os.getenv("CONTEXT_MAX_SESSIONS", "100000")),
+    ttl=float(os.getenv("CONTEXT_TTL", "1800")),
+)
 
-TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL")
-if not TELEGRAM_WEBHOOK_URL:
-    raise ValueError("FATAL ERROR: TELEGRAM_WEBHOOK_URL is not set!")
+Gauge("kianoland_context_sessions", "Jumlah sesi percakapan yang konteksnya disimpan", lambda: CONTEXT_STORE.stats()["size"])
 
-TELEGRAM_API_URL = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}"
+async def run_detect_intent(text: str, channel: str, session: Optional[str] = None):
+    """Deteksi intent lewat executor; tolak dengan 503 bila antrean executor penuh.
 
-BOT_PREFIXES = ('!', '/', '$')
+    session (mis. "telegram:<chat_id>") mengaktifkan konteks percakapan untuk pesan ini.
+    """
+    started = time.perf_counter()
+    context = CONTEXT_STORE.get(session) if session else None
+    try:
+        detection = await nlp_executor.detect(text, context)
+    except ExecutorSaturated as e:
+        logger.warning("detection rejected", extra={"fields": {"channel": channel, "reason": str(e)}})
+        raise HTTPException(503, str(e))
+    if session:
+        CONTEXT_STORE.put(session, detection.context)
+    record_detection(channel, detection, started)
+    return detection.response
 
 @app.post("/detect-intent")
 async def detect_intent_endpoint(text: str):
-    return detect_intent(text)
+    return await run_detect_intent(text, "api")
+
+BATCH_MAX_UTTERANCES = int(os.getenv("BATCH_MAX_UTTERANCES", "50000"))
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "256"))
+
+class BatchRequest(BaseModel):
+    utterances: List[str]
+
+async def run_detect_batch(texts: List[str]):
+    started = time.perf_counter()
+    try:
+        detections = await nlp_executor.detect_batch(texts, chunk_size=BATCH_CHUNK_SIZE)
+    except ExecutorSaturated as e:
+        logger.warning("batch rejected", extra={"fields": {"channel": "batch", "size": len(texts), "reason": str(e)}})
+        raise HTTPException(503, str(e))
+    REQUESTS.inc("batch")
+    REQUEST_LATENCY.observe(time.perf_counter() - started, "batch")
+    for detection in detections:
+        RULE_HITS.inc(detection.rule)
+    logger.info("batch detected", extra={"fields": {"channel": "batch", "size": len(texts), "ms": elapsed_ms(started)}})
+    return [detection.response for detection in detections]
+
+def parse_ndjson_line(line: bytes) -> str:
+    """Satu baris NDJSON: string JSON, objek {"text": ...}, atau teks biasa"""
+    try:
+        item = json.loads(line)
+    except ValueError:
+        return line.decode("utf-8")
+    if isinstance(item, dict):
+        return str(item.get("text", item.get("user_input", "")))
+    return str(item)
+
+@app.post("/detect-intent/batch")
+async def detect_intent_batch_endpoint(request: Request):
+    """Klasifikasi banyak utterance sekaligus (misal replay log chat).
+
+    - application/json: {"utterances": ["...", ...]} -> {"results": [...]}
+    - application/x-ndjson: satu utterance per baris, hasil di-stream per baris dengan urutan yang sama
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" not in content_type:
+        try:
+            batch = BatchRequest(**await request.json())
+        except (ValueError, TypeError) as e:
+            raise HTTPException(422, str(e))
+        if len(batch.utterances) > BATCH_MAX_UTTERANCES:
+            raise HTTPException(413, f"Maksimal {BATCH_MAX_UTTERANCES} utterance per batch")
+        return {"results": await run_detect_batch(batch.utterances)}
+
+    # Body dibaca bertahap dan tiap potongan langsung dideteksi selagi upload berjalan.
+    # Body harus habis dibaca sebelum response dikirim (StreamingResponse ikut membaca
+    # receive() untuk mendeteksi disconnect), jadi hasil dikirim setelahnya.
+    lines_out: List[str] = []
+    serialized: Dict[int, str] = {}
+
+    async def flush(chunk: List[str]):
+        for result in await run_detect_batch(chunk):
+            # Hasil yang sama (dari cache) cukup diserialisasi sekali
+            if id(result) not in serialized:
+                serialized[id(result)] = json.dumps(result, ensure_ascii=False)
+            lines_out.append(serialized[id(result)])
+
+    chunk, buffer, total = [], b"", 0
+    async for data in request.stream():
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        chunk.extend(parse_ndjson_line(line) for line in lines if line.strip())
+        if total + len(chunk) > BATCH_MAX_UTTERANCES:
+            raise HTTPException(413, f"Maksimal {BATCH_MAX_UTTERANCES} utterance per batch")
+        if len(chunk) >= BATCH_CHUNK_SIZE:
+            total += len(chunk)
+            await flush(chunk)
+            chunk = []
+    if buffer.strip():
+        chunk.append(parse_ndjson_line(buffer))
+    await flush(chunk)
+
+    async def stream_results():
+        for i in range(0, len(lines_out), BATCH_CHUNK_SIZE):
+            yield "".join(line + "\n" for line in lines_out[i:i + BATCH_CHUNK_SIZE])
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
 
 @app.get("/")
 async def root():
     return {"message": "Kiano Property Bot API is running"}
 
-# Initialize Discord Client
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
-discord_bot = commands.Bot(command_prefix=BOT_PREFIXES, intents=intents)
+# Discord Client: paket discord hanya diimpor (lazy) bila integrasi Discord aktif
+discord_bot = None
+discord_task: Optional[asyncio.Task] = None
+# Bot gateway hanya berjalan di worker pemilik BOT_LOCK; balasan /discord-webhook dikirim lewat
+# REST API Discord dengan token bot sehingga worker mana pun bisa menjawab webhook
+discord_client: Optional[httpx.AsyncClient] = None
+
+async def post_discord_message(channel_id: int, text: str):
+    started = time.perf_counter()
+    response = await discord_client.post(
+        f"{DISCORD_API_BASE}/channels/{channel_id}/messages",
+        headers={"Authorization": f"Bot {DISCORD_TOKEN}"},
+        json={"content": text},
+    )
+    SEND_LATENCY.observe(time.perf_counter() - started, "discord")
+    response.raise_for_status()
 
 # Discord Models
 class DiscordMessage(BaseModel):
@@ -85,119 +260,116 @@ class DiscordMessage(BaseModel):
     channel_id: int
     author: dict
 
-# Discord Bot Functions
-def run_discord_bot():
-    @discord_bot.event
-    async def on_ready():
-        await discord_bot.change_presence(
-            activity=discord.Activity(
-                type=discord.ActivityType.watching,
-                name=f"#{discord_bot.get_channel(DEDICATED_CHANNEL_ID).name}"
-            )
-        )
-        print(f'Logged in as {discord_bot.user} (ID: {discord_bot.user.id})')
-
-        channel = discord_bot.get_channel(DEDICATED_CHANNEL_ID)
-        async for msg in channel.history(limit=5):
-            if msg.author == discord_bot.user and "PANDUAN" in msg.content:
-                break
-        else:
-            await channel.send(
-                "📌 **PANDUAN PENGGUNAAN**\n"
-                "1. Ketik `!info` untuk melihat promo properti\n"
-                "2. Gunakan `!konsul [pertanyaan]` untuk bantuan\n"
-                "3. Bot hanya aktif di channel ini"
-            )
-
-    @discord_bot.event
-    async def on_message(message):
-        if message.author.bot:
-            return
-
-        # Handle commands first
-        ctx = await discord_bot.get_context(message)
-        if ctx.command:
-            await discord_bot.invoke(ctx)
-            return
-
-        try:
-            if message.channel.id == DEDICATED_CHANNEL_ID:
-                response = detect_intent(message.content)
-                if not response or 'discord' not in response:
-                    await message.reply("Maaf, terjadi kesalahan saat memproses permintaan Anda")
-                else:
-                    # Pecah pesan dan kirim satu per satu
-                    messages_to_send = response['discord'].split('|||')
-                    for msg in messages_to_send:
-                        if msg.strip(): # Pastikan pesan tidak kosong
-                            await message.reply(msg.strip())
-        except Exception as e:
-            print(f"Error processing message: {str(e)}")
-            await message.reply("Maaf, terjadi kesalahan. Silakan coba lagi.")
-
-    @discord_bot.command()
-    async def proyek(ctx):
-        result = detect_intent("daftar proyek")
-        await ctx.send(result['discord'])
-
-    @discord_bot.command()
-    async def info(ctx):
-        response = detect_intent("info properti")
-        await ctx.send(response['discord'])
-
-    @discord_bot.command()
-    async def konsul(ctx, *, question: str = None):
-        if not question:
-            await ctx.send("Silakan ajukan pertanyaan Anda setelah perintah `!konsul`. Contoh: `!konsul info harga Kiano 3`")
-            return
-
-        thread = await ctx.channel.create_thread(
-            name=f"Konsul-{ctx.author.display_name}",
-            type=discord.ChannelType.private_thread,
-            reason=f"Konsultasi properti oleh {ctx.author}"
-        )
-        response = detect_intent(question)
-        await thread.send(
-            f"🛎️ Konsultasi dimulai oleh {ctx.author.mention}!\n"
-            f"**Pertanyaan:** {question}\n\n"
-            f"**Jawaban:** {response['discord']}"
-        )
-        await ctx.message.delete()
-
-    discord_bot.run(DISCORD_TOKEN)
-
 # REST API Endpoints
 @app.post("/discord-webhook")
 async def discord_webhook(message: DiscordMessage):
+    if discord_client is None:
+        raise HTTPException(404, "Integrasi Discord tidak aktif")
     try:
         if message.author.get("bot", False):
             return {"status": "ignored"}
 
-        result = detect_intent(message.content)
-        channel = discord_bot.get_channel(message.channel_id)
-        await channel.send(result['discord'])
+        session = f"discord:{message.channel_id}:{message.author.get('id')}"
+        result = await run_detect_intent(message.content, "discord-webhook", session)
+        for text in pack_fragments(result['discord'].split('|||'), DISCORD_MESSAGE_LIMIT):
+            await post_discord_message(message.channel_id, text)
 
         return {"status": "success"}
+    except HTTPException:
+        raise
+    except httpx.HTTPError as e:
+        logger.error("Discord send failed: %s", e)
+        raise HTTPException(502, "Gagal mengirim pesan ke Discord")
     except Exception as e:
         raise HTTPException(400, str(e))
 
 # 🛠️ Konfigurasi Telegram
-TELEGRAM_API_URL = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}"
+# Satu AsyncClient untuk seluruh aplikasi (dibuat saat startup, ditutup saat shutdown) agar
+# koneksi TCP/TLS ke Bot API dipakai ulang antar pesan, bukan handshake baru per fragmen.
+telegram_client: Optional[httpx.AsyncClient] = None
+telegram_webhook_task: Optional[asyncio.Task] = None
+
+def create_telegram_client() -> httpx.AsyncClient:
+    try:
+        import h2  # noqa: F401
+        http2 = True
+    except ImportError:
+        http2 = False
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("TELEGRAM_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("TELEGRAM_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.getenv("TELEGRAM_KEEPALIVE_EXPIRY", "60")),
+        ),
+        timeout=httpx.Timeout(float(os.getenv("TELEGRAM_TIMEOUT", "10")), connect=5.0),
+    )
+
+async def post_telegram_message(chat_id: int, text: str) -> httpx.Response:
+    started = time.perf_counter()
+    response = await telegram_client.post(
+        f"{TELEGRAM_API_URL}/sendMessage",
+        json={"chat_id": chat_id, "text": text, "parse_mode": "HTML"}
+    )
+    SEND_LATENCY.observe(time.perf_counter() - started, "telegram")
+    return response
+
+# TELEGRAM_WEBHOOK_MODE=inline: deteksi & kirim balasan sebelum webhook dijawab (perilaku lama)
+# TELEGRAM_WEBHOOK_MODE=queue: update dimasukkan ke antrean berbatas dan webhook langsung dijawab,
+# sehingga Bot API yang lambat tidak membuat Telegram mengirim ulang update yang sama
+TELEGRAM_WEBHOOK_MODE = os.getenv("TELEGRAM_WEBHOOK_MODE", "inline").lower()
+if TELEGRAM_WEBHOOK_MODE not in WEBHOOK_MODES:
+    raise ValueError(f"FATAL ERROR: TELEGRAM_WEBHOOK_MODE harus salah satu dari {WEBHOOK_MODES}")
+
+# Semua pesan keluar Telegram lewat scheduler: rate limit global, retry saat 429. Bucket per chat
+# hanya di mode queue; di mode inline menunggu token akan menahan webhook terbuka
+telegram_sender = OutboundScheduler.from_env(post_telegram_message, pace_chats=TELEGRAM_WEBHOOK_MODE == "queue")
 
 async def send_telegram_message(chat_id: int, text: str):
-    async with httpx.AsyncClient() as client:
-        await client.post(
-            f"{TELEGRAM_API_URL}/sendMessage",
-            json={"chat_id": chat_id, "text": text, "parse_mode": "HTML"}
-        )
+    return await telegram_sender.send(chat_id, text)
+
+async def process_telegram_message(chat_id: int, text: str):
+    result = await run_detect_intent(text, "telegram", f"telegram:{chat_id}")
+
+    # Pecah pesan dan kirim berurutan (digabung jika TELEGRAM_COALESCE aktif)
+    await telegram_sender.send_fragments(chat_id, result['telegram'].split('|||'))
+
+# Mode queue: webhook sudah dijawab 200, jadi 503 dari executor tidak akan dikirim ulang Telegram.
+# Worker menunggu kapasitas executor (backoff) paling lama TELEGRAM_BUSY_TIMEOUT detik, lalu
+# membalas pesan "sibuk" alih-alih membuang pesan diam-diam
+TELEGRAM_BUSY_TIMEOUT = float(os.getenv("TELEGRAM_BUSY_TIMEOUT", "10"))
+TELEGRAM_BUSY_MESSAGE = "Maaf, server sedang sibuk. Silakan kirim ulang pesan Anda sebentar lagi."
+
+async def process_queued_telegram_message(chat_id: int, text: str):
+    deadline = time.monotonic() + TELEGRAM_BUSY_TIMEOUT
+    delay = 0.1
+    while True:
+        try:
+            return await process_telegram_message(chat_id, text)
+        except HTTPException as e:
+            if e.status_code != 503:
+                raise
+            if time.monotonic() + delay > deadline:
+                logger.warning("telegram update busy", extra={"fields": {"chat_id": chat_id, "reason": e.detail}})
+                await send_telegram_message(chat_id, TELEGRAM_BUSY_MESSAGE)
+                return
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 1.0)
+
+telegram_queue = UpdateQueue.from_env(process_queued_telegram_message)
+
+Gauge("kianoland_telegram_queue_depth", "Update Telegram yang menunggu diproses worker", lambda: telegram_queue.depth)
 
 class ChatRequest(BaseModel):
     user_input: str
+    # Dibuat oleh frontend per tab browser; tanpa session_id tidak ada konteks percakapan
+    session_id: Optional[str] = Field(None, max_length=64)
 
 @app.post("/chat")
 async def chat(request: ChatRequest):
     try:
-        result = detect_intent(request.user_input)
+        session = f"web:{request.session_id}" if request.session_id else None
+        result = await run_detect_intent(request.user_input, "web", session)
         # Pecah respons menjadi beberapa pesan jika ada pemisah '|||'
         formatted_responses = result['web'].split('|||')
         
@@ -207,46 +379,291 @@ async def chat(request: ChatRequest):
                 "formatted": formatted_responses # Kirim sebagai list
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(400, str(e))
 
+@app.websocket("/ws/chat")
+async def chat_websocket(websocket: WebSocket, session_id: Optional[str] = None):
+    """Transport chat web lewat satu koneksi WebSocket (tanpa HTTP request + preflight CORS per pesan).
+
+    Klien mengirim {"user_input": "...", "id": <opsional>}. Setiap fragmen '|||' dikirim sebagai
+    {"type": "fragment", "id", "index", "text"} begitu siap, lalu {"type": "done", "id", "response"}
+    dengan bentuk yang sama seperti respons /chat. Error dikirim sebagai {"type": "error", ...}
+    tanpa menutup koneksi. Pesan dari satu koneksi diproses berurutan.
+    """
+    await websocket.accept()
+    # Tanpa session_id dari klien, konteks percakapan tetap berlaku selama koneksi ini
+    session = f"web:{(session_id or secrets.token_hex(8))[:64]}"
+    try:
+        while True:
+            data = await websocket.receive_json()
+            message_id = data.get("id") if isinstance(data, dict) else None
+            try:
+                request = ChatRequest.model_validate(data)
+                result = await run_detect_intent(request.user_input, "web", session)
+            except ValidationError as e:
+                await websocket.send_json({"type": "error", "id": message_id, "status": 422, "detail": e.errors(include_url=False)})
+                continue
+            except HTTPException as e:
+                await websocket.send_json({"type": "error", "id": message_id, "status": e.status_code, "detail": e.detail})
+                continue
+
+            formatted_responses = result['web'].split('|||')
+            for index, fragment in enumerate(formatted_responses):
+                await websocket.send_json({"type": "fragment", "id": message_id, "index": index, "text": fragment})
+            await websocket.send_json({
+                "type": "done",
+                "id": message_id,
+                "response": {"raw": result['raw'], "formatted": formatted_responses},
+            })
+    except WebSocketDisconnect:
+        pass
+    except Exception:
+        # Mis. payload bukan JSON: tutup koneksi, klien akan menyambung ulang
+        logger.exception("Error in chat_websocket")
+        await websocket.close(code=1003)
+
 @app.post("/telegram-webhook")
 async def telegram_webhook(request: Request):
+    if not ENABLE_TELEGRAM:
+        raise HTTPException(404, "Integrasi Telegram tidak aktif")
     try:
         update = await request.json()
-        print("Received Telegram update:", update)  # Log update
-        
+        # Hanya ringkasan update yang dicatat (level DEBUG), bukan seluruh payload
+        logger.debug("Received Telegram update", extra={"fields": {
+            "update_id": update.get("update_id"), "has_message": "message" in update,
+        }})
+
         if "message" in update:
             chat_id = update["message"]["chat"]["id"]
             text = update["message"].get("text", "")
 
-            result = detect_intent(text)
+            if telegram_queue.running:
+                # Mode queue: langsung dijawab 200, deteksi & pengiriman dikerjakan worker
+                try:
+                    await telegram_queue.submit(chat_id, text)
+                except QueueFull as e:
+                    logger.warning("telegram update rejected", extra={"fields": {"chat_id": chat_id, "reason": str(e)}})
+                    raise HTTPException(503, str(e))
+            else:
+                await process_telegram_message(chat_id, text)
 
-            # Pecah pesan dan kirim satu per satu
-            messages_to_send = result['telegram'].split('|||')
-            for msg in messages_to_send:
-                if msg.strip(): # Pastikan pesan tidak kosong
-                    await send_telegram_message(chat_id, msg.strip())
-            
         return {"ok": True}
+    except HTTPException:
+        raise
     except Exception as e:
-        print("Error in telegram_webhook:", str(e))  # Log error
+        logger.exception("Error in telegram_webhook: %s", e)
         raise HTTPException(500, "Internal Server Error")
 
+# 🔄 Hot reload model NLP (intent & entitas dari dialogflow_kianoland/)
+# - POST /admin/reload dengan header X-Admin-Token (aktif jika ADMIN_TOKEN di-set)
+# - MODEL_WATCH_INTERVAL > 0: cek perubahan file setiap N detik dan reload otomatis
+# - Multi-worker: /admin/reload hanya diterima satu worker; worker itu menulis generasi baru ke
+#   MODEL_RELOAD_MARKER dan worker lain (memeriksa tiap MODEL_RELOAD_POLL detik) ikut reload
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "0"))
+MODEL_RELOAD_POLL = float(os.getenv("MODEL_RELOAD_POLL", "2"))
+RELOAD_MARKER = ReloadMarker.from_env()
+reload_lock = asyncio.Lock()
+model_watch_task: Optional[asyncio.Task] = None
+reload_marker_task: Optional[asyncio.Task] = None
+# Generasi marker yang sudah diterapkan worker ini
+reload_generation: Optional[str] = None
+
+async def reload_model(reason: str) -> local_nlp.NLPModel:
+    """Bangun snapshot baru di thread terpisah lalu pasang secara atomik.
+
+    Request yang sedang berjalan tetap memakai model lama sampai selesai; bila build gagal
+    (mis. JSON rusak) model lama tetap aktif.
+    """
+    async with reload_lock:
+        started = time.perf_counter()
+        model = await asyncio.to_thread(local_nlp.build_model)
+        local_nlp.swap_model(model)
+        nlp_executor.refresh(model)
+        logger.info("model reloaded", extra={"fields": {"reason": reason, **model.summary(), "ms": elapsed_ms(started)}})
+        return model
+
+async def watch_model_files():
+    failed_fingerprint = None
+    while True:
+        await asyncio.sleep(MODEL_WATCH_INTERVAL)
+        fingerprint = None
+        try:
+            fingerprint = await asyncio.to_thread(local_nlp.source_fingerprint)
+            if fingerprint in (local_nlp.MODEL.fingerprint, failed_fingerprint):
+                continue
+            await reload_model("file-watch")
+        except Exception:
+            # Jangan ulangi reload yang gagal untuk isi file yang sama
+            failed_fingerprint = fingerprint
+            logger.exception("Model reload failed, keeping v%d", local_nlp.MODEL.version)
+
+async def watch_reload_marker():
+    global reload_generation
+    while True:
+        await asyncio.sleep(MODEL_RELOAD_POLL)
+        try:
+            generation = await asyncio.to_thread(RELOAD_MARKER.read)
+            if generation == reload_generation:
+                continue
+            # Dicatat sebelum reload: build yang gagal tidak diulang untuk generasi yang sama
+            reload_generation = generation
+            await reload_model("admin-broadcast")
+        except Exception:
+            logger.exception("Model reload failed, keeping v%d", local_nlp.MODEL.version)
+
+@app.post("/admin/reload")
+async def admin_reload(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(404, "Not Found")
+    if not secrets.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(403, "Forbidden")
+    global reload_generation
+    try:
+        model = await reload_model("admin")
+    except Exception as e:
+        logger.exception("Model reload failed, keeping v%d", local_nlp.MODEL.version)
+        raise HTTPException(500, f"Reload gagal: {e}")
+    # Worker lain menyusul lewat watch_reload_marker; worker ini tidak perlu reload dua kali
+    reload_generation = await asyncio.to_thread(RELOAD_MARKER.publish)
+    return {"status": "reloaded", "model": model.summary()}
+
+async def register_telegram_webhook(attempts: int = 5):
+    """setWebhook di background: startup (dan /chat) tidak menunggu Bot API.
+
+    Gagal/timeout dicoba ulang dengan backoff; Telegram tetap menyimpan webhook terakhir
+    yang terdaftar sehingga kegagalan di sini tidak menghentikan aplikasi.
+    """
+    for attempt in range(attempts):
+        try:
+            res = await telegram_client.post(
+                f"{TELEGRAM_API_URL}/setWebhook",
+                json={"url": TELEGRAM_WEBHOOK_URL}
+            )
+            logger.info("Telegram setWebhook result: %s", res.json())
+            return
+        except Exception as e:
+            logger.warning("Telegram setWebhook failed (attempt %d/%d): %s", attempt + 1, attempts, e)
+            await asyncio.sleep(min(2.0 ** attempt, 30.0))
+    logger.error("Telegram setWebhook gave up after %d attempts", attempts)
+
+# Mode multi-worker (gunicorn / uvicorn --workers): semua worker melayani HTTP & webhook, tapi
+# bot Discord dan setWebhook hanya dijalankan satu proses pemegang kunci file BOT_LOCK_FILE.
+# Worker lain mencoba ulang setiap BOT_LOCK_RETRY detik sehingga bisa mengambil alih bila
+# pemilik mati.
+BOT_LOCK = ProcessLock.from_env()
+BOT_LOCK_RETRY = float(os.getenv("BOT_LOCK_RETRY", "5"))
+bot_owner_task: Optional[asyncio.Task] = None
+
+# Multi-worker: METRICS_DIR (di-set gunicorn_conf.py) berisi snapshot metrik tiap worker yang
+# ditulis setiap METRICS_FLUSH_INTERVAL detik; /metrics menjumlahkan semuanya (lihat metrics.py)
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+metrics_flush_task: Optional[asyncio.Task] = None
+
+async def flush_metrics():
+    while True:
+        await asyncio.sleep(METRICS_FLUSH_INTERVAL)
+        try:
+            await asyncio.to_thread(write_snapshot, METRICS_DIR)
+        except OSError:
+            logger.exception("Metrics snapshot failed")
+
+async def claim_bot_ownership():
+    global discord_bot, discord_task, telegram_webhook_task
+    while not BOT_LOCK.acquire():
+        await asyncio.sleep(BOT_LOCK_RETRY)
+    logger.info("Bot ownership acquired", extra={"fields": {"pid": os.getpid(), "lock": BOT_LOCK.path}})
+
+    if ENABLE_DISCORD:
+        from .discord_bot import create_discord_bot, run_discord_bot
+        discord_bot = create_discord_bot(DEDICATED_CHANNEL_ID, run_detect_intent)
+        discord_task = asyncio.create_task(run_discord_bot(discord_bot, DISCORD_TOKEN))
+    if ENABLE_TELEGRAM:
+        telegram_webhook_task = asyncio.create_task(register_telegram_webhook())
+
 @app.on_event("startup")
 async def startup_event():
-    load_intents()
-    thread = threading.Thread(target=run_discord_bot, daemon=True)
-    thread.start()
-
-    # Telegram webhook setup
-    async with httpx.AsyncClient() as client:
-        res = await client.post(
-            f"{TELEGRAM_API_URL}/setWebhook",
-            json={"url": TELEGRAM_WEBHOOK_URL}
-        )
-        print("Telegram setWebhook result:", res.json())
+    global telegram_client, discord_client, model_watch_task, reload_marker_task, bot_owner_task, reload_generation
+    global metrics_flush_task
+    # Model (intent + entitas) sudah dibangun saat local_nlp diimpor
+    nlp_executor.start()
+    if METRICS_DIR:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        metrics_flush_task = asyncio.create_task(flush_metrics())
+    if MODEL_WATCH_INTERVAL > 0:
+        model_watch_task = asyncio.create_task(watch_model_files())
+    if ADMIN_TOKEN and MODEL_RELOAD_POLL > 0:
+        # Worker yang di-fork ulang dari master memakai model hasil preload; reload yang
+        # diterbitkan setelah model itu dibangun tetap diterapkan oleh watcher
+        if RELOAD_MARKER.published_at() <= local_nlp.MODEL.loaded_at:
+            reload_generation = RELOAD_MARKER.read()
+        reload_marker_task = asyncio.create_task(watch_reload_marker())
+
+    if ENABLE_TELEGRAM:
+        # Setiap worker bisa menerima webhook dan mengirim balasan
+        if TELEGRAM_WEBHOOK_MODE == "queue":
+            telegram_queue.start()
+        telegram_client = create_telegram_client()
+    if ENABLE_DISCORD:
+        discord_client = httpx.AsyncClient(timeout=httpx.Timeout(10.0, connect=5.0))
+    if ENABLE_DISCORD or ENABLE_TELEGRAM:
+        bot_owner_task = asyncio.create_task(claim_bot_ownership())
+    logger.info("Startup complete", extra={"fields": {
+        "pid": os.getpid(), "discord": ENABLE_DISCORD, "telegram": ENABLE_TELEGRAM,
+    }})
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if model_watch_task is not None:
+        model_watch_task.cancel()
+    if reload_marker_task is not None:
+        reload_marker_task.cancel()
+    if bot_owner_task is not None:
+        bot_owner_task.cancel()
+    if telegram_webhook_task is not None:
+        telegram_webhook_task.cancel()
+    if discord_task is not None:
+        await discord_bot.close()
+        try:
+            await asyncio.wait_for(discord_task, timeout=5)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            discord_task.cancel()
+    BOT_LOCK.release()
+    # Worker Telegram masih butuh telegram_client untuk mengirim sisa antrean
+    await telegram_queue.shutdown()
+    if telegram_client is not None:
+        await telegram_client.aclose()
+    if discord_client is not None:
+        await discord_client.aclose()
+    nlp_executor.shutdown()
+    if metrics_flush_task is not None:
+        metrics_flush_task.cancel()
+        # Counter worker yang berhenti tetap ikut dijumlahkan worker lain
+        write_snapshot(METRICS_DIR)
 
 @app.get("/health")
 async def health_check():
-    return {"status": "online"}
\ No newline at end of file
+    return {
+        "status": "degraded" if nlp_executor.saturated else "online",
+        "model": local_nlp.MODEL.summary(),
+        "cache": RESPONSE_CACHE.stats(),
+        "executor": nlp_executor.stats(),
+        "context": CONTEXT_STORE.stats(),
+        "integrations": {"discord": ENABLE_DISCORD, "telegram": ENABLE_TELEGRAM},
+        "process": {"pid": os.getpid(), "bot_owner": BOT_LOCK.held},
+        "telegram_queue": telegram_queue.stats(),
+        "telegram_sender": telegram_sender.stats(),
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Metrik format Prometheus: request per channel, hit per ATURAN, latensi per tahap & pengiriman"""
+    if METRICS_DIR:
+        body = await asyncio.to_thread(render_metrics, METRICS_DIR)
+    else:
+        body = render_metrics()
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
@@ -0,0 +1,34 @@
+"""Kompilasi dialogflow_kianoland/ menjadi satu artifact model biner.
+
+    python -m backend.build_model [--output build/nlp_model.bin]
+
+Server memuat artifact ini saat start (lihat local_nlp.load_model_artifact) dan kembali
+memuat dari JSON jika artifact tidak ada, di luar direktori build, rusak, atau isi data/kode
+sudah berubah. Artifact berisi pickle: jangan memuat artifact dari sumber lain.
+"""
+import argparse
+import os
+import time
+
+# Model dibangun sekali di main(), bukan juga saat local_nlp diimpor
+os.environ["NLP_LOAD_ON_IMPORT"] = "false"
+
+from . import local_nlp  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build artifact model NLP Kianoland")
+    parser.add_argument("--output", default=local_nlp.MODEL_ARTIFACT_PATH or os.path.join(local_nlp.MODEL_BUILD_DIR, "nlp_model.bin"))
+    args = parser.parse_args(argv)
+
+    # Hash dihitung sebelum data dibaca: perubahan selama build membuat artifact langsung basi
+    source = local_nlp.model_source_hash()
+    started = time.perf_counter()
+    model = local_nlp.build_model()
+    local_nlp.save_model_artifact(model, args.output, source)
+    print(f"✅ Model artifact ditulis ke {args.output} ({os.path.getsize(args.output)} bytes, "
+          f"{len(model.intents)} intents, {len(model.response_table)} respons) dalam {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class ContextStore:
+    """Konteks percakapan per sesi (chat Telegram, channel+author Discord, session web).
+
+    Dibatasi jumlah sesi (max_size, LRU) dan TTL yang bergeser setiap kali sesi dipakai.
+    Karena TTL selalu diperbarui bersamaan dengan urutan LRU, entri paling depan selalu yang
+    paling dulu kedaluwarsa sehingga pembersihan cukup memeriksa bagian depan saja.
+
+    Nilai konteks (tuple kecil berisi nama proyek/tipe/lokasi) di-intern: sesi dengan
+    konteks yang sama berbagi satu objek, jadi memori per sesi hanya key + satu entri dict.
+    Hanya dipakai dari event loop, jadi tidak memakai lock.
+    """
+
+    def __init__(self, max_size: int = 100000, ttl: float = 1800.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._interned: Dict[tuple, tuple] = {}
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if self.max_size <= 0:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        context, expires_at = entry
+        now = time.monotonic()
+        if expires_at < now:
+            del self._entries[key]
+            return None
+        self._entries[key] = (context, now + self.ttl)
+        self._entries.move_to_end(key)
+        return context
+
+    def put(self, key: Hashable, context: Optional[tuple]):
+        if self.max_size <= 0:
+            return
+        if not context:
+            self._entries.pop(key, None)
+            return
+        context = self._interned.setdefault(context, context)
+        now = time.monotonic()
+        self._entries[key] = (context, now + self.ttl)
+        self._entries.move_to_end(key)
+        self._evict(now)
+
+    def _evict(self, now: float):
+        while self._entries:
+            key, (_, expires_at) = next(iter(self._entries.items()))
+            if expires_at >= now and len(self._entries) <= self.max_size:
+                break
+            del self._entries[key]
+            self.evictions += 1
+        # Kombinasi konteks terbatas (proyek x tipe x lokasi), tapi tetap dijaga tidak tumbuh liar
+        if len(self._interned) > 4096:
+            self._interned.clear()
+
+    def clear(self):
+        self._entries.clear()
+        self._interned.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "evictions": self.evictions,
+        }
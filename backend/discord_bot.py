@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+
+import discord
+from discord.ext import commands
+
+from .metrics import SEND_LATENCY
+from .outbound import DISCORD_MESSAGE_LIMIT, pack_fragments
+
+logger = logging.getLogger("kianoland.discord")
+
+BOT_PREFIXES = ('!', '/', '$')
+
+# run_detect_intent(text, channel, session=None) dari app.py
+DetectFunc = Callable[..., Awaitable[dict]]
+
+
+def create_discord_bot(dedicated_channel_id: int, detect: DetectFunc) -> commands.Bot:
+    """Bangun client Discord beserta event & command-nya.
+
+    Modul ini (dan paket discord) hanya diimpor app.py bila integrasi Discord aktif.
+    """
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.members = True
+    discord_bot = commands.Bot(command_prefix=BOT_PREFIXES, intents=intents)
+
+    @discord_bot.event
+    async def on_ready():
+        await discord_bot.change_presence(
+            activity=discord.Activity(
+                type=discord.ActivityType.watching,
+                name=f"#{discord_bot.get_channel(dedicated_channel_id).name}"
+            )
+        )
+        logger.info("Logged in as %s (ID: %s)", discord_bot.user, discord_bot.user.id)
+
+        channel = discord_bot.get_channel(dedicated_channel_id)
+        async for msg in channel.history(limit=5):
+            if msg.author == discord_bot.user and "PANDUAN" in msg.content:
+                break
+        else:
+            await channel.send(
+                "📌 **PANDUAN PENGGUNAAN**\n"
+                "1. Ketik `!info` untuk melihat promo properti\n"
+                "2. Gunakan `!konsul [pertanyaan]` untuk bantuan\n"
+                "3. Bot hanya aktif di channel ini"
+            )
+
+    @discord_bot.event
+    async def on_message(message):
+        if message.author.bot:
+            return
+
+        # Handle commands first
+        ctx = await discord_bot.get_context(message)
+        if ctx.command:
+            await discord_bot.invoke(ctx)
+            return
+
+        try:
+            if message.channel.id == dedicated_channel_id:
+                session = f"discord:{message.channel.id}:{message.author.id}"
+                response = await detect(message.content, "discord", session)
+                if not response or 'discord' not in response:
+                    await message.reply("Maaf, terjadi kesalahan saat memproses permintaan Anda")
+                else:
+                    # Fragmen digabung menjadi pesan <= 2000 karakter (biasanya cukup satu reply),
+                    # bukan satu reply per fragmen; urutan tetap dijaga
+                    for msg in pack_fragments(response['discord'].split('|||'), DISCORD_MESSAGE_LIMIT):
+                        send_started = time.perf_counter()
+                        await message.reply(msg)
+                        SEND_LATENCY.observe(time.perf_counter() - send_started, "discord")
+        except Exception as e:
+            logger.exception("Error processing message: %s", e)
+            await message.reply("Maaf, terjadi kesalahan. Silakan coba lagi.")
+
+    @discord_bot.command()
+    async def proyek(ctx):
+        result = await detect("daftar proyek", "discord")
+        await ctx.send(result['discord'])
+
+    @discord_bot.command()
+    async def info(ctx):
+        response = await detect("info properti", "discord")
+        await ctx.send(response['discord'])
+
+    @discord_bot.command()
+    async def konsul(ctx, *, question: str = None):
+        if not question:
+            await ctx.send("Silakan ajukan pertanyaan Anda setelah perintah `!konsul`. Contoh: `!konsul info harga Kiano 3`")
+            return
+
+        thread = await ctx.channel.create_thread(
+            name=f"Konsul-{ctx.author.display_name}",
+            type=discord.ChannelType.private_thread,
+            reason=f"Konsultasi properti oleh {ctx.author}"
+        )
+        response = await detect(question, "discord")
+        await thread.send(
+            f"🛎️ Konsultasi dimulai oleh {ctx.author.mention}!\n"
+            f"**Pertanyaan:** {question}\n\n"
+            f"**Jawaban:** {response['discord']}"
+        )
+        await ctx.message.delete()
+
+    return discord_bot
+
+
+async def run_discord_bot(discord_bot: commands.Bot, token: str):
+    """Bot Discord berjalan sebagai task di event loop aplikasi (bukan thread dengan loop sendiri)"""
+    try:
+        await discord_bot.start(token)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        # Gagal login/koneksi tidak boleh menjatuhkan API web & Telegram
+        logger.exception("Discord bot stopped")
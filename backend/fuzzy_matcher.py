@@ -0,0 +1,156 @@
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+class Correction(NamedTuple):
+    """Satu kata yang dikoreksi: posisi di teks hasil koreksi, kata asli dan jarak edit"""
+    start: int
+    end: int
+    typed: str
+    distance: int
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Jarak Damerau-Levenshtein (optimal string alignment: salah ketik, sisip, hapus, tukar
+    dua huruf bersebelahan). Berhenti lebih awal; hasil > max_distance dilaporkan max_distance + 1.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    before: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, before[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        before, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+def _deletes(word: str, depth: int) -> Set[str]:
+    """Semua string hasil menghapus 0..depth huruf dari word"""
+    variants = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        variants |= frontier
+    return variants
+
+
+class FuzzyMatcher:
+    """Koreksi kata salah ketik dengan indeks deletion ala SymSpell.
+
+    Setiap kata target disimpan bersama semua variannya setelah dihapus hingga max_distance
+    huruf. Kata yang dicari cukup dibuat variannya dengan cara yang sama lalu dicocokkan ke
+    indeks; hanya kandidat yang ditemukan yang dihitung jarak editnya, jadi biaya lookup tidak
+    bergantung pada jumlah kata di indeks.
+
+    Kata yang dikenal tapi bukan target (kosakata umum dari frasa pelatihan) tidak pernah
+    dikoreksi, begitu pula kata pendek yang hanya kurang akhiran dari target. Hasil lookup di-memo per kata (dibatasi memo_size) karena kata yang sama
+    berulang di banyak pesan; memo tidak ikut dipickle ke artifact.
+    """
+
+    def __init__(self, max_distance: int = 2, min_length: int = 4, long_word: int = 8, memo_size: int = 50000):
+        self.max_distance = max_distance
+        self.min_length = min_length
+        self.long_word = long_word
+        self.memo_size = memo_size
+        self._words: Dict[str, int] = {}  # kata -> urutan ditambahkan (tie-break: yang lebih dulu menang)
+        self._deletes: Dict[str, List[str]] = {}
+        self._memo: Dict[Tuple[str, int], Optional[Tuple[str, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._words
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_memo'] = {}
+        return state
+
+    def add(self, word: str, target: bool = True):
+        """Daftarkan kata; target=False berarti hanya dikenal (tidak dikoreksi, bukan hasil koreksi)"""
+        if not word or word in self._words:
+            return
+        self._words[word] = len(self._words)
+        if target and len(word) >= self.min_length:
+            for variant in _deletes(word, self.max_distance):
+                self._deletes.setdefault(variant, []).append(word)
+
+    def lookup(self, word: str, max_distance: Optional[int] = None) -> Optional[Tuple[str, int]]:
+        """(kata target terdekat, jarak) dalam batas jarak, atau None"""
+        if word in self._words:
+            return word, 0
+        limit = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        # Kata pendek hanya boleh berbeda satu huruf (dua edit pada kata 4-7 huruf sudah kata lain)
+        short = len(word) < self.long_word
+        if short:
+            limit = min(limit, 1)
+        if limit <= 0 or len(word) < self.min_length:
+            return None
+        memo_key = (word, limit)
+        if memo_key in self._memo:
+            return self._memo[memo_key]
+        candidates = set()
+        for variant in _deletes(word, limit):
+            candidates.update(self._deletes.get(variant, ()))
+        best = None
+        for candidate in candidates:
+            # Kata pendek yang merupakan awalan target ("bekas" -> "bekasi", "kian" -> "kiano")
+            # biasanya kata utuh lain tanpa akhiran, bukan salah ketik
+            if short and candidate.startswith(word):
+                continue
+            distance = edit_distance(word, candidate, limit)
+            if distance <= limit and (best is None or (distance, self._words[candidate]) < best):
+                best = (distance, self._words[candidate], candidate)
+        found = None if best is None else (best[2], best[0])
+        if len(self._memo) >= self.memo_size:
+            self._memo.clear()
+        self._memo[memo_key] = found
+        return found
+
+    def correct(self, text: str, max_distance: Optional[int] = None,
+                words: Optional[Iterable[str]] = None) -> Tuple[str, List[Correction]]:
+        """Ganti setiap kata yang tidak dikenal dengan kata terdekat di indeks.
+
+        words: kata-kata text jika sudah dihitung pemanggil (mis. dari tahap normalisasi).
+        Kata yang mengandung angka tidak dikoreksi ("kiano 5" bukan salah ketik "kiano 1").
+        Mengembalikan (teks hasil koreksi, daftar Correction); tanpa koreksi teks dikembalikan apa adanya.
+        """
+        # Tahap cepat: sebagian besar pesan hanya berisi kata yang sudah dikenal
+        replacements: Dict[str, Tuple[str, int]] = {}
+        for word in set(WORD_PATTERN.findall(text) if words is None else words).difference(self._words):
+            if len(word) < self.min_length or any(ch.isdigit() for ch in word):
+                continue
+            found = self.lookup(word, max_distance)
+            if found is not None and found[1] > 0:
+                replacements[word] = found
+        if not replacements:
+            return text, []
+
+        pieces: List[str] = []
+        corrections: List[Correction] = []
+        position = shift = 0
+        for match in WORD_PATTERN.finditer(text):
+            word = match.group(0)
+            if word not in replacements:
+                continue
+            replacement, distance = replacements[word]
+            pieces.append(text[position:match.start()])
+            pieces.append(replacement)
+            start = match.start() + shift
+            corrections.append(Correction(start, start + len(replacement), word, distance))
+            shift += len(replacement) - len(word)
+            position = match.end()
+        pieces.append(text[position:])
+        return "".join(pieces), corrections
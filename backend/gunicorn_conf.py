@@ -0,0 +1,45 @@
+"""Konfigurasi gunicorn untuk mode multi-worker:
+
+    gunicorn -c backend/gunicorn_conf.py backend.app:app
+
+preload_app: backend.app (model NLP, aset frontend) diimpor sekali di proses master lalu
+worker di-fork, sehingga data read-only itu dipakai bersama copy-on-write alih-alih dibangun
+ulang per worker. gc.freeze() sebelum fork memindahkan semua objek tersebut ke generasi
+permanen GC agar siklus GC di worker tidak menulis ke (dan menyalin) halaman memorinya.
+
+Bot Discord dan setWebhook Telegram tetap hanya dijalankan satu worker (lihat BOT_LOCK_FILE
+di app.py).
+
+Metrik /metrics digabung dari semua worker lewat METRICS_DIR (default direktori sementara,
+dikosongkan setiap kali master start) sehingga scrape ke worker mana pun memberi total yang sama.
+"""
+import gc
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+# Diset sebelum aplikasi di-preload agar app.py membacanya
+os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), "kianoland-metrics"))
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+# Log akses dari uvicorn sudah cukup; log aplikasi tetap JSON lewat logger "kianoland"
+accesslog = None
+
+
+def on_starting(server):
+    # Counter dimulai dari nol per deployment; snapshot worker dari run sebelumnya dibuang
+    shutil.rmtree(os.environ["METRICS_DIR"], ignore_errors=True)
+
+
+def when_ready(server):
+    # Dipanggil di master setelah aplikasi di-preload dan sebelum worker pertama di-fork
+    gc.collect()
+    gc.freeze()
+    server.log.info("Preloaded app frozen for copy-on-write sharing (%d objects)", gc.get_freeze_count())
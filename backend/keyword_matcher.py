@@ -0,0 +1,82 @@
+from collections import deque
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+def _is_word_char(ch: str) -> bool:
+    """Sama dengan definisi \\w pada modul re (untuk str)"""
+    return ch.isalnum() or ch == '_'
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton untuk mencari banyak kata kunci dalam satu kali scan.
+
+    Setiap kata kunci membawa `payload` dan flag `whole_word` yang meniru
+    semantik `re.search(r'\\b' + keyword + r'\\b', text)`. Tanpa flag tersebut
+    pencocokan setara dengan `keyword in text`.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        self._keywords: List[Tuple[str, Any, bool]] = []
+
+    def __len__(self) -> int:
+        return len(self._keywords)
+
+    def add(self, keyword: str, payload: Any, whole_word: bool = False):
+        """Daftarkan kata kunci. Panggil build() setelah semua kata kunci ditambahkan."""
+        if not keyword:
+            return
+        state = 0
+        for ch in keyword:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][ch] = next_state
+            state = next_state
+        self._output[state].append(len(self._keywords))
+        self._keywords.append((keyword, payload, whole_word))
+
+    def build(self) -> 'KeywordMatcher':
+        """Hitung failure link (BFS) dan gabungkan output tiap state"""
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(ch, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+        return self
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """Yield (start, end, payload) untuk setiap kemunculan kata kunci, termasuk yang overlap."""
+        goto, fail, output, keywords = self._goto, self._fail, self._output, self._keywords
+        text_len = len(text)
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not output[state]:
+                continue
+            end = i + 1
+            for keyword_id in output[state]:
+                keyword, payload, whole_word = keywords[keyword_id]
+                start = end - len(keyword)
+                if whole_word:
+                    before = start > 0 and _is_word_char(text[start - 1])
+                    if before == _is_word_char(keyword[0]):
+                        continue
+                    after = end < text_len and _is_word_char(text[end])
+                    if after == _is_word_char(keyword[-1]):
+                        continue
+                yield start, end, payload
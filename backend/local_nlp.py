@@ -1,48 +1,82 @@
 import json
 import os
 from difflib import SequenceMatcher
-from typing import Dict, List, Optional
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import itertools
+import logging
 import re
+import threading
+import time
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from .fuzzy_matcher import FuzzyMatcher
+from .keyword_matcher import KeywordMatcher
+from .logging_setup import begin_trace, configure_logging, end_trace, trace
+from .metrics import observe_stages
+from .model_artifact import read_artifact, source_hash, write_artifact
+from .ngram_classifier import IntentPrediction, NgramClassifier, np
+from .response_cache import ResponseCache
+from .rule_table import RuleSet, candidate_rules, compile_rules, condition_matches, format_static, load_rule_table, resolve_args
+from .text_normalizer import NormalizedText, Normalizer, load_slang
 
 # Configuration
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DIALOGFLOW_FOLDER = os.path.join(BASE_DIR, "dialogflow_kianoland")
 ENTITIES_FOLDER = os.path.join(DIALOGFLOW_FOLDER, "entities")
 INTENTS_FOLDER = os.path.join(DIALOGFLOW_FOLDER, "intents")
-
-# Data storage
-INTENTS: List[dict] = []
-ENTITIES: Dict[str, list] = {}
-
-def load_resources():
-    """Load all NLP resources"""
-    load_intents()
-    load_entities()
+# Artifact model hasil `python -m backend.build_model`; kosongkan untuk selalu memuat dari JSON.
+# Artifact berisi pickle, jadi hanya dimuat dari MODEL_BUILD_DIR (lihat model_artifact.read_artifact)
+MODEL_BUILD_DIR = os.path.join(BASE_DIR, "build")
+MODEL_ARTIFACT_PATH = os.getenv("NLP_MODEL_ARTIFACT", os.path.join(MODEL_BUILD_DIR, "nlp_model.bin"))
+# "false": jangan muat model saat modul diimpor (build_model, proses worker NLP yang menerima
+# model dari parent); pemanggil yang memasang model sendiri lewat load_resources/swap_model
+LOAD_ON_IMPORT_ENV = "NLP_LOAD_ON_IMPORT"
+
+configure_logging()
+logger = logging.getLogger("kianoland.nlp")
+
+# Cache hasil deteksi (Detection), key = (versi model, input ternormalisasi, konteks) (lihat cache_key)
+RESPONSE_CACHE = ResponseCache(
+    max_size=int(os.getenv("NLP_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("NLP_CACHE_TTL", "600")),
+)
+
+def load_resources() -> 'NLPModel':
+    """Load all NLP resources (precompiled artifact if fresh, else JSON) and swap them in"""
+    model = load_model_artifact() or build_model()
+    swap_model(model)
+    return model
 
 marketing_contacts = {
     "default": "+62 811-1611-724"
 }
 
-def load_intents():
+# ===== NORMALISASI TEKS =====
+# Singkatan/slang -> bentuk baku ({"berapa": ["brp", ...]}); dipakai bersama untuk frasa
+# pelatihan, kata kunci aturan, sinonim entitas dan input pengguna (lihat text_normalizer.py)
+SLANG_FILE = "slang.json"
+
+def build_normalizer(folder: str = DIALOGFLOW_FOLDER) -> Normalizer:
+    normalizer = Normalizer(load_slang(os.path.join(folder, SLANG_FILE)))
+    logger.info("✅ Loaded %d slang variants", len(normalizer))
+    return normalizer
+
+def load_intents(intents_folder: str = INTENTS_FOLDER, normalizer: Normalizer = None) -> List[dict]:
     """Load intents from JSON files"""
-    global INTENTS
-    INTENTS = []
-    
-    for filename in os.listdir(INTENTS_FOLDER):
+    normalizer = normalizer or build_normalizer(os.path.dirname(intents_folder))
+    intents = []
+
+    for filename in os.listdir(intents_folder):
         if filename.endswith('.json'):
-            with open(os.path.join(INTENTS_FOLDER, filename), 'r', encoding='utf-8') as f:
+            with open(os.path.join(intents_folder, filename), 'r', encoding='utf-8') as f:
                 data = json.load(f)
                 if 'displayName' in data:
-                    # Ekstrak frasa pelatihan dengan normalisasi
+                    # Ekstrak frasa pelatihan: bagian-bagian frasa digabung apa adanya (spasi di
+                    # batas bagian ikut) lalu dinormalisasi dengan tahap yang sama seperti input pengguna
                     training_phrases = []
                     for phrase in data.get('trainingPhrases', []):
-                        full_phrase = ""
-                        for part in phrase['parts']:
-                            # NORMALISASI: hilangkan spasi berlebih dan perbaiki huruf berulang
-                            normalized_text = re.sub(r'\s+', ' ', part['text']).strip()
-                            normalized_text = re.sub(r'(\w)\1{2,}', r'\1', normalized_text.lower())
-                            full_phrase += normalized_text
-                        training_phrases.append(full_phrase)
+                        full_phrase = "".join(part['text'] for part in phrase['parts'])
+                        training_phrases.append(normalizer.normalize(full_phrase).text)
                     
                     # Ekstrak respons
                     responses = []
@@ -54,28 +88,279 @@ def load_intents():
                             responses.append(combined_text)
 
                     
-                    INTENTS.append({
+                    intents.append({
                         'name': data['displayName'],
                         'phrases': training_phrases,
                         'responses': responses
                     })
-    print(f"✅ Loaded {len(INTENTS)} intents")
+    logger.info("✅ Loaded %d intents", len(intents))
     # Debug: Tampilkan nama intent dan jumlah frasa
-    for intent in INTENTS:
-        print(f"  - {intent['name']} ({len(intent['phrases'])} phrases)")
-
-def load_entities():
+    for intent in intents:
+        logger.debug("  - %s (%d phrases)", intent['name'], len(intent['phrases']))
+    return intents
+
+# ===== INDEKS FRASA (ATURAN #14) =====
+SIMILARITY_THRESHOLD = 0.75
+# Jumlah kandidat teratas (berdasarkan kemiripan n-gram) yang dinilai ulang dengan SequenceMatcher
+SIMILARITY_CANDIDATES = 10
+# Intent prioritas tinggi yang sudah ditangani aturan kata kunci, tidak ikut pencocokan kemiripan
+SIMILARITY_EXCLUDED_INTENTS = [
+    'default_fallback', 'info_promo', 'info_harga', 'info_lokasi', 'info_fasilitas',
+    'syarat_dokumen', 'rekomendasi_proyek', 'minat_beli', 'info_kontak', 'bantuan', 'daftar_proyek', 'welcome'
+]
+
+# ===== ENGINE KLASIFIKASI N-GRAM (opsional, butuh numpy) =====
+# rules  : hanya kaskade aturan (rules.json) + SequenceMatcher di ATURAN #14
+# hybrid : klasifier n-gram menjadi penentu di ATURAN #14 sebelum SequenceMatcher yang mahal
+# ngram  : klasifier n-gram memutuskan intent sebelum kaskade aturan, kecuali aturan yang
+#          bergantung pada entitas proyek (ENTITY_GATED_RULES); kaskade aturan bila tidak yakin
+NLP_ENGINES = ('rules', 'hybrid', 'ngram')
+NLP_ENGINE = os.getenv("NLP_ENGINE", "rules").lower()
+if NLP_ENGINE not in NLP_ENGINES:
+    raise ValueError(f"NLP_ENGINE harus salah satu dari {NLP_ENGINES}, bukan '{NLP_ENGINE}'")
+if NLP_ENGINE != 'rules' and np is None:
+    logger.warning("NLP_ENGINE=%s butuh numpy yang tidak terpasang, memakai engine 'rules'", NLP_ENGINE)
+    NLP_ENGINE = 'rules'
+# Confidence (probabilitas terkalibrasi) minimal agar prediksi klasifier dipakai
+NGRAM_MIN_CONFIDENCE = float(os.getenv("NLP_NGRAM_MIN_CONFIDENCE", "0.8"))
+# Aturan yang tetap dievaluasi sebelum klasifier di engine ngram: proyek tidak valid (7A),
+# proyek + tipe/topik (7B-7D) dan harga tanpa proyek (8, menanyakan proyeknya). Klasifier
+# hanya memprediksi intent, tidak bisa memilih blok tipe atau bertanya balik.
+ENTITY_GATED_RULES = frozenset({'7A', '7B', '7C', '7D', '8'})
+
+def build_intent_classifier(intents: List[dict]) -> Optional[NgramClassifier]:
+    """Latih NgramClassifier dari trainingPhrases semua intent; None bila numpy tidak tersedia"""
+    if np is None:
+        return None
+    started = time.perf_counter()
+    classifier = NgramClassifier.train((phrase, intent['name']) for intent in intents for phrase in intent['phrases'])
+    logger.info("✅ Trained n-gram classifier on %d phrases in %.0f ms (temperature %.3f)",
+                len(classifier), (time.perf_counter() - started) * 1000, classifier.temperature)
+    return classifier
+
+def classifier_exclusions() -> List[str]:
+    """Intent yang tidak boleh diprediksi klasifier: mode hybrid menggantikan ATURAN #14, jadi pengecualiannya sama"""
+    return SIMILARITY_EXCLUDED_INTENTS if NLP_ENGINE == 'hybrid' else []
+
+def predict_intents(texts: List[str], model: 'NLPModel' = None) -> Optional[List[IntentPrediction]]:
+    """Prediksi klasifier untuk banyak teks ternormalisasi dalam satu operasi matriks.
+
+    Hanya untuk engine ngram (setiap pesan butuh prediksi); di mode hybrid klasifier baru
+    dipanggil saat ATURAN #14 tercapai, jadi None dikembalikan dan prediksi dihitung saat itu.
+    """
+    model = model or MODEL
+    if NLP_ENGINE != 'ngram' or model.classifier is None:
+        return None
+    return model.classifier.classify_batch(texts, classifier_exclusions())
+
+def _classifier_response(user_input_normalized: str, model: 'NLPModel', entities: Dict[str, str],
+                         prediction: Optional[IntentPrediction]):
+    """(intent, response) dari prediksi klasifier yang cukup yakin, atau None"""
+    started = time.perf_counter()
+    if prediction is None:
+        prediction = model.classifier.classify(user_input_normalized, classifier_exclusions())
+    STAGE_TIMES.classifier += time.perf_counter() - started
+    if prediction.confidence < NGRAM_MIN_CONFIDENCE:
+        trace(logger, "🤔 N-gram classifier unsure: %s (confidence %.2f)", prediction.intent, prediction.confidence)
+        return None
+    trace(logger, "🎯 N-gram classifier: %s (confidence %.2f, score %.2f)", prediction.intent, prediction.confidence, prediction.score)
+    response = render_template(prediction.intent, entities.get('proyek'), entities.get('lokasi'), model=model)
+    return (prediction.intent, response) if response else None
+
+def char_ngrams(text: str, n: int = 3) -> set:
+    """Set of character n-grams, padded so very short strings still produce n-grams"""
+    padded = f" {text} "
+    return {padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))}
+
+def build_phrase_index(intents: List[dict]) -> tuple:
+    """Build an inverted character-trigram index over the training phrases used by Rule #14.
+
+    Returns (entries, index, max_length): entries berisi (frasa, intent, jumlah n-gram) urut
+    sesuai intents, index memetakan n-gram -> id frasa.
+    """
+    entries, index = [], {}
+    for intent in intents:
+        if intent['name'] in SIMILARITY_EXCLUDED_INTENTS:
+            continue
+        for phrase in intent.get('phrases', []):
+            grams = char_ngrams(phrase)
+            for gram in grams:
+                index.setdefault(gram, []).append(len(entries))
+            entries.append((phrase, intent, len(grams)))
+    return entries, index, max((len(phrase) for phrase, _, _ in entries), default=0)
+
+def find_similar_phrase(text: str, model: 'NLPModel' = None) -> Optional[tuple]:
+    """Cari frasa pelatihan paling mirip (ratio SequenceMatcher > SIMILARITY_THRESHOLD).
+
+    Ratio SequenceMatcher tidak mungkin melebihi 2*min(n, m)/(n + m), sehingga frasa dengan
+    panjang yang terlalu berbeda langsung dilewati (termasuk input berupa paragraf panjang).
+    Sisa kandidat diurutkan berdasarkan kemiripan trigram, lalu hanya beberapa teratas yang
+    dinilai ulang secara eksak. Mengembalikan (intent, skor, frasa) atau None.
+    """
+    model = model or MODEL
+    text_length = len(text)
+    if not text_length or text_length * SIMILARITY_THRESHOLD > (2 - SIMILARITY_THRESHOLD) * model.phrase_max_length:
+        return None
+
+    grams = char_ngrams(text)
+    overlaps: Dict[int, int] = {}
+    for gram in grams:
+        for phrase_id in model.phrase_index.get(gram, ()):
+            overlaps[phrase_id] = overlaps.get(phrase_id, 0) + 1
+
+    scored = []
+    for phrase_id, overlap in overlaps.items():
+        phrase, _, phrase_grams = model.phrase_entries[phrase_id]
+        phrase_length = len(phrase)
+        if 2 * min(text_length, phrase_length) <= SIMILARITY_THRESHOLD * (text_length + phrase_length):
+            continue
+        scored.append((2 * overlap / (len(grams) + phrase_grams), phrase_id))
+    scored.sort(reverse=True)
+    candidates = sorted(phrase_id for _, phrase_id in scored[:SIMILARITY_CANDIDATES])
+
+    best, highest_score = None, SIMILARITY_THRESHOLD
+    for phrase_id in candidates:
+        phrase, intent, _ = model.phrase_entries[phrase_id]
+        similarity = SequenceMatcher(None, text, phrase).ratio()
+        if similarity > highest_score:
+            best, highest_score = (intent, similarity, phrase), similarity
+    return best
+
+def load_entities(entities_folder: str = ENTITIES_FOLDER) -> Dict[str, list]:
     """Load entities from JSON files"""
-    global ENTITIES
-    ENTITIES = {}
-    
-    for filename in os.listdir(ENTITIES_FOLDER):
+    entities = {}
+
+    for filename in os.listdir(entities_folder):
         if filename.endswith('_entries.json'): 
             entity_name = filename.replace('_entries.json', '')
-            with open(os.path.join(ENTITIES_FOLDER, filename), 'r', encoding='utf-8') as f:
+            with open(os.path.join(entities_folder, filename), 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                ENTITIES[entity_name] = data['entries'] if isinstance(data, dict) else data
-    print(f"✅ Loaded {len(ENTITIES)} entities")
+                entities[entity_name] = data['entries'] if isinstance(data, dict) else data
+    logger.info("✅ Loaded %d entities", len(entities))
+    return entities
+
+# ===== INDEKS ENTITAS =====
+# Entitas yang dideteksi dari file JSON (dicocokkan dengan word boundary)
+INDEXED_ENTITY_TYPES = ['proyek', 'lokasi', 'tipe_rumah']
+# Sinonim umum yang tidak boleh dianggap sebagai nama proyek
+GENERIC_PROJECT_SYNONYMS = ['proyek', 'project', 'properti', 'rumah', 'perumahan']
+
+# Tipe rumah manual (untuk selector di template), dicocokkan sebagai substring
+MANUAL_TYPE_SYNONYMS: Dict[str, Dict[str, List[str]]] = {
+    # --- Tipe Rumah Kiano 3 ---
+    'tipe_kiano3': {
+        'K3_1_Lantai': ['1 lantai', 'satu lantai', '40/60', '40 per 60', 'empat puluh / enam puluh', 'empat puluh per enam puluh'],
+        'K3_Mezzanine': ['mezzanine', '1,5 lantai', 'satu setengah lantai', '60/60', '1 koma 5 lantai', 'satu koma lima lantai', '60 per 60', 'enam puluh / enam puluh', 'enam puluh per enam puluh'],
+        'K3_2_Lantai': ['2 lantai', 'dua lantai', '80/60', '80 per 60', 'delapan puluh / enam puluh', 'delapan puluh per enam puluh']
+    },
+    # --- Tipe Green Jonggol Village ---
+    'tipe_gjv': {
+        'GJV_subsidi': ['subsidi', 'tipe 30/60', '30/60', '30 per 60', 'tiga puluh / enam puluh', 'tiga puluh per enam puluh'],
+        'GJV_komersil': ['komersil', 'tipe 36/72', '36/72', '36 per 72', 'tiga enam / tujuh dua', 'tiga enam per tujuh dua']
+    },
+}
+PROJECT_PATTERN = re.compile(r'\b(kiano|nlk)\s*(\d+)\b')
+
+def build_entity_index(entities: Dict[str, list], normalizer: Normalizer) -> tuple:
+    """Compile every entity synonym into a single keyword automaton.
+
+    Payload tiap sinonim adalah (tipe, urutan entri, urutan sinonim, value) sehingga
+    prioritas lama (entri pertama yang cocok menang) tetap bisa dihitung dari hasil scan.
+    Returns (matcher, nama proyek valid).
+    """
+    matcher = KeywordMatcher()
+    for entity_type in INDEXED_ENTITY_TYPES:
+        for entry_rank, entry in enumerate(entities.get(entity_type, [])):
+            for synonym_rank, synonym in enumerate(entry.get('synonyms', [])):
+                synonym_normalized = normalizer.normalize(synonym).text
+                if entity_type == 'proyek' and synonym_normalized in GENERIC_PROJECT_SYNONYMS:
+                    continue
+                matcher.add(synonym_normalized, (entity_type, entry_rank, synonym_rank, entry['value']), whole_word=True)
+    for entity_type, types in MANUAL_TYPE_SYNONYMS.items():
+        for entry_rank, (key, synonyms) in enumerate(types.items()):
+            for synonym_rank, synonym in enumerate(synonyms):
+                matcher.add(normalizer.normalize(synonym).text, (entity_type, entry_rank, synonym_rank, key))
+    matcher.build()
+
+    valid_project_names = set()
+    for entry in entities.get('proyek', []):
+        valid_project_names.add(entry['value'].lower())
+        valid_project_names.update(synonym.lower() for synonym in entry.get('synonyms', []))
+    logger.info("✅ Indexed %d entity synonyms", len(matcher))
+    return matcher, frozenset(valid_project_names)
+
+def find_entity_matches(text: str, model: 'NLPModel' = None) -> List[tuple]:
+    """Return every entity span in one pass: [(start, end, tipe, value, prioritas), ...]"""
+    return [
+        (start, end, entity_type, value, (entry_rank, synonym_rank))
+        for start, end, (entity_type, entry_rank, synonym_rank, value) in (model or MODEL).entity_matcher.iter_matches(text)
+    ]
+
+# ===== KOREKSI SALAH KETIK ENTITAS =====
+# Kata yang tidak dikenal ("tgia", "cibarusahh") dikoreksi ke kata terdekat lewat indeks
+# deletion (lihat fuzzy_matcher.py), lalu teks hasil koreksi dipindai ulang dengan automaton
+# entitas. Hanya dipakai untuk tipe entitas yang tidak ditemukan secara eksak.
+FUZZY_ENTITY_TYPES = INDEXED_ENTITY_TYPES
+# Kedalaman indeks (ikut tersimpan di artifact); batas saat lookup diatur NLP_FUZZY_MAX_DISTANCE
+FUZZY_INDEX_DISTANCE = 2
+FUZZY_MAX_DISTANCE = int(os.getenv("NLP_FUZZY_MAX_DISTANCE", "2"))  # 0 = nonaktif
+# confidence = 1 - jumlah edit / panjang sinonim yang cocok
+FUZZY_MIN_CONFIDENCE = float(os.getenv("NLP_FUZZY_MIN_CONFIDENCE", "0.85"))
+
+class EntityCorrection(NamedTuple):
+    """Entitas yang ditemukan setelah koreksi salah ketik"""
+    entity: str
+    value: str
+    typed: str      # kata asli dari pengguna
+    matched: str    # sinonim yang cocok setelah koreksi
+    confidence: float
+
+def build_fuzzy_index(entities: Dict[str, list], intents: List[dict], keyword_groups: Dict[str, dict],
+                      normalizer: Normalizer) -> FuzzyMatcher:
+    """Kosakata koreksi: kata sinonim entitas sebagai target, kata kunci aturan dan frasa
+    pelatihan sebagai kata yang dikenal (tidak pernah dikoreksi).
+    """
+    matcher = FuzzyMatcher(FUZZY_INDEX_DISTANCE)
+    for entity_type in FUZZY_ENTITY_TYPES:
+        for entry in entities.get(entity_type, []):
+            for synonym in entry.get('synonyms', []):
+                for word in normalizer.normalize(synonym).tokens:
+                    matcher.add(word)
+    for spec in keyword_groups.values():
+        for keyword in spec['keywords']:
+            for word in normalizer.normalize(keyword).tokens:
+                matcher.add(word, target=False)
+    for intent in intents:
+        for phrase in intent.get('phrases', []):
+            for word in normalizer.normalize(phrase).tokens:
+                matcher.add(word, target=False)
+    logger.info("✅ Indexed %d words for typo correction", len(matcher))
+    return matcher
+
+def find_fuzzy_entities(text: str, entity_types: List[str], model: 'NLPModel' = None,
+                        tokens: Optional[Tuple[str, ...]] = None) -> List[EntityCorrection]:
+    """Entitas (dari entity_types) yang hanya cocok setelah koreksi salah ketik, maksimal satu per tipe"""
+    model = model or MODEL
+    corrected, corrections = model.fuzzy_matcher.correct(text, FUZZY_MAX_DISTANCE, tokens)
+    if not corrections:
+        return []
+    best: Dict[str, tuple] = {}
+    for start, end, entity_type, value, rank in find_entity_matches(corrected, model):
+        if entity_type not in entity_types:
+            continue
+        touched = [correction for correction in corrections if correction.start < end and correction.end > start]
+        if not touched:
+            continue
+        edits = sum(correction.distance for correction in touched)
+        confidence = 1 - edits / (end - start)
+        if confidence < FUZZY_MIN_CONFIDENCE:
+            continue
+        # Sama seperti pencocokan eksak: prioritas entri/sinonim dulu, lalu jumlah edit
+        key = (rank, edits)
+        if entity_type not in best or key < best[entity_type][0]:
+            typed = " ".join(correction.typed for correction in touched)
+            best[entity_type] = (key, EntityCorrection(entity_type, value, typed, corrected[start:end], round(confidence, 3)))
+    return [correction for _, correction in best.values()]
 
 # Tambahkan fungsi similar setelah load_entities
 def similar(a: str, b: str) -> float:
@@ -94,45 +379,34 @@ def get_valid_projects():
     return available_projects
 
 # 2. Fungsi validasi proyek menggunakan entitas
-def is_valid_project(project_name: str) -> bool:
+def is_valid_project(project_name: str, model: 'NLPModel' = None) -> bool:
     """Cek apakah proyek valid berdasarkan entitas secara lebih ketat."""
-    project_lower = project_name.lower().strip()
-    
-    # Cek di semua entitas proyek
-    for entry in ENTITIES.get('proyek', []):
-        # Cek value utama (nama resmi proyek)
-        if project_lower == entry['value'].lower():
-            return True
-        
-        # Cek semua sinonimnya
-        for synonym in entry.get('synonyms', []):
-            if project_lower == synonym.lower():
-                return True
-                
-    return False
-
-def detect_entities(text: str) -> Dict[str, str]:
-    """Detects projects, locations, and house types from user input."""
+    # Value utama (nama resmi proyek) dan semua sinonimnya sudah diindeks di build_entity_index
+    return project_name.lower().strip() in (model or MODEL).valid_project_names
+
+def detect_entities(text: str, model: 'NLPModel' = None, corrections: Optional[List[EntityCorrection]] = None,
+                    tokens: Optional[Tuple[str, ...]] = None) -> Dict[str, str]:
+    """Detects projects, locations, and house types from normalized user input (lihat normalize_input).
+
+    tokens: kata-kata text dari tahap normalisasi (dihitung ulang jika None). Entitas yang
+    ditemukan lewat koreksi salah ketik ditambahkan ke corrections (jika diberikan).
+    """
     detected = {}
-    text_lower = text.lower()
+
+    # Satu kali scan untuk semua sinonim; per tipe, entri dengan prioritas tertinggi yang menang
+    best: Dict[str, tuple] = {}
+    for start, end, entity_type, value, rank in find_entity_matches(text, model):
+        if entity_type not in best or rank < best[entity_type][0]:
+            best[entity_type] = (rank, value, text[start:end])
 
     # --- Deteksi Proyek ---
-    # Prioritaskan deteksi proyek dengan sinonim yang lebih spesifik
-    for entry in ENTITIES.get('proyek', []):
-        for synonym in entry.get('synonyms', []):
-            pattern = r'\b' + re.escape(synonym.lower()) + r'\b'
-            if re.search(pattern, text_lower):
-                # Pastikan ini bukan sinonim umum seperti 'proyek' atau 'rumah'
-                if synonym.lower() not in ['proyek', 'project', 'properti', 'rumah', 'perumahan']:
-                    detected['proyek'] = entry['value']
-                    print(f"✅ Proyek terdeteksi (from entity): '{synonym}' -> {entry['value']}")
-                    break
-        if 'proyek' in detected:
-            break
+    if 'proyek' in best:
+        _, detected['proyek'], synonym = best['proyek']
+        trace(logger, "✅ Proyek terdeteksi (from entity): '%s' -> %s", synonym, detected['proyek'])
             
     # Fallback untuk deteksi proyek jika tidak ditemukan via entitas langsung (misal: "kiano 3")
     if 'proyek' not in detected:
-        match = re.search(r'\b(kiano|nlk)\s*(\d+)\b', text_lower)
+        match = PROJECT_PATTERN.search(text)
         if match:
             project_base_name = "Natureland Kiano"
             project_number = match.group(2)
@@ -140,390 +414,269 @@ def detect_entities(text: str) -> Dict[str, str]:
             # Hanya tambahkan jika itu bukan pertanyaan umum seperti "kiano berapa"
             if constructed_name.lower() not in ['natureland kiano group']: 
                 detected['proyek'] = constructed_name
-                print(f"⚠️  Proyek terdeteksi via pattern (might be invalid): '{match.group(0)}' -> {constructed_name}")
-
-    # --- Deteksi Lokasi ---
-    for entry in ENTITIES.get('lokasi', []):
-        for synonym in entry.get('synonyms', []):
-            pattern = r'\b' + re.escape(synonym.lower()) + r'\b'
-            if re.search(pattern, text_lower):
-                detected['lokasi'] = entry['value']
-                print(f"✅ Lokasi terdeteksi (from entity): '{synonym}' -> {entry['value']}")
-                break
-        if 'lokasi' in detected:
-            break
-
-    # --- Deteksi Tipe Rumah (umum, misal "30/60") ---
-    for entry in ENTITIES.get('tipe_rumah', []):
-        for synonym in entry.get('synonyms', []):
-            pattern = r'\b' + re.escape(synonym.lower()) + r'\b'
-            if re.search(pattern, text_lower):
-                detected['tipe_rumah'] = entry['value']
-                print(f"✅ Tipe Rumah terdeteksi: '{synonym}' -> {key}")
-                break
-        if 'tipe_rumah' in detected:
-            break
-
-    # --- Deteksi Tipe Rumah Kiano 3 (Manual - untuk selector di template) ---
-    kiano3_types = {
-        'K3_1_Lantai': ['1 lantai', 'satu lantai', '40/60', '40 per 60', 'empat puluh / enam puluh', 'empat puluh per enam puluh'],
-        'K3_Mezzanine': ['mezzanine', '1,5 lantai', 'satu setengah lantai', '60/60', '1 koma 5 lantai', 'satu koma lima lantai', '60 per 60', 'enam puluh / enam puluh', 'enam puluh per enam puluh'],
-        'K3_2_Lantai': ['2 lantai', 'dua lantai', '80/60', '80 per 60', 'delapan puluh / enam puluh', 'delapan puluh per enam puluh']
-    }
-    for key, synonyms in kiano3_types.items():
-        for synonym in synonyms:
-            if synonym in text_lower:
-                detected['tipe_kiano3'] = key
-                print(f"✅ Tipe Kiano 3 terdeteksi (manual): '{synonym}' -> {key}")
-                break 
-        if 'tipe_kiano3' in detected:
-            break
-            
-    # --- Deteksi Tipe Green Jonggol Village (Manual - untuk selector di template) ---
-    gjv_types = {
-        'GJV_subsidi': ['subsidi', 'tipe 30/60', '30/60', '30 per 60', 'tiga puluh / enam puluh', 'tiga puluh per enam puluh'],
-        'GJV_komersil': ['komersil', 'tipe 36/72', '36/72', '36 per 72', 'tiga enam / tujuh dua', 'tiga enam per tujuh dua']
-    }
-    for key, synonyms in gjv_types.items():
-        for synonym in synonyms:
-            if synonym in text_lower:
-                detected['tipe_gjv'] = key
-                print(f"✅ Tipe GJV terdeteksi (manual): '{synonym}' -> {key}")
-                break
-        if 'tipe_gjv' in detected:
-            break
-
-
-    print(f"🧩 Detected entities: {detected}")
+                trace(logger, "⚠️  Proyek terdeteksi via pattern (might be invalid): '%s' -> %s", match.group(0), constructed_name)
+
+    # --- Deteksi Lokasi, Tipe Rumah (umum, misal "30/60"), Tipe Kiano 3 & GJV (manual) ---
+    for entity_type in ['lokasi', 'tipe_rumah', 'tipe_kiano3', 'tipe_gjv']:
+        if entity_type in best:
+            _, detected[entity_type], synonym = best[entity_type]
+            trace(logger, "✅ %s terdeteksi: '%s' -> %s", entity_type, synonym, detected[entity_type])
+
+    # --- Koreksi salah ketik untuk proyek/lokasi/tipe rumah yang belum ditemukan ---
+    missing = [entity_type for entity_type in FUZZY_ENTITY_TYPES if entity_type not in detected]
+    if missing and FUZZY_MAX_DISTANCE > 0:
+        for correction in find_fuzzy_entities(text, missing, model, tokens):
+            detected[correction.entity] = correction.value
+            trace(logger, "🔤 %s terdeteksi (koreksi '%s' -> '%s', confidence %.2f) -> %s", correction.entity,
+                  correction.typed, correction.matched, correction.confidence, correction.value)
+            if corrections is not None:
+                corrections.append(correction)
+
+    trace(logger, "🧩 Detected entities: %s", detected)
     return detected
 
+# ===== KATA KUNCI ATURAN =====
+# Grup kata kunci & urutan aturan ada di dialogflow_kianoland/rules.json (lihat rule_table.py).
+# Semua grup dikompilasi sekali menjadi satu automaton (lihat build_rule_matcher), sehingga
+# detect_intent_local cukup melakukan satu kali scan untuk mengetahui grup mana yang cocok.
+# Urutan kata kunci dalam grup menentukan kata kunci mana yang dilaporkan bila beberapa cocok.
+RULES_FILE = "rules.json"
+
+def build_rule_matcher(keyword_groups: Dict[str, dict], normalizer: Normalizer) -> KeywordMatcher:
+    """Compile all rule keyword groups into a single keyword automaton.
+
+    Kata kunci dinormalisasi seperti input ("brp" di rules.json tetap cocok dengan "berapa").
+    """
+    matcher = KeywordMatcher()
+    for group, spec in keyword_groups.items():
+        for rank, keyword in enumerate(spec['keywords']):
+            matcher.add(normalizer.normalize(keyword).text, (group, rank), whole_word=spec.get('whole_word', False))
+    matcher.build()
+    logger.info("✅ Compiled %d rule keywords", len(matcher))
+    return matcher
+
+def match_rule_keywords(text: str, model: 'NLPModel' = None) -> Dict[str, str]:
+    """Scan text once and return {grup: kata kunci pertama yang cocok} for every rule group hit."""
+    best: Dict[str, tuple] = {}
+    for start, end, (group, rank) in (model or MODEL).rule_matcher.iter_matches(text):
+        if group not in best or rank < best[group][0]:
+            best[group] = (rank, text[start:end])
+    return {group: keyword for group, (rank, keyword) in best.items()}
+
+def normalize_message(user_input: str, model: 'NLPModel' = None) -> NormalizedText:
+    """Teks ternormalisasi + daftar kata (lihat Normalizer); di-memo per model"""
+    return (model or MODEL).normalizer.normalize(user_input)
+
+def normalize_input(user_input: str, model: 'NLPModel' = None) -> str:
+    """Lowercase, strip punctuation, collapse repeated letters ("haloooo" -> "halo") and expand slang ("brp" -> "berapa")"""
+    return normalize_message(user_input, model).text
+
+def cache_key(user_input: str, version: int = None, context: 'ConversationContext' = None) -> tuple:
+    """Key RESPONSE_CACHE: (versi model, input ternormalisasi, konteks percakapan).
+
+    Versi model ikut di key sehingga hasil dari model lama (request yang masih berjalan saat
+    reload) tidak pernah tersaji untuk model baru. Konteks ikut di key karena pesan lanjutan
+    seperti "lokasinya?" dijawab berbeda tergantung proyek yang dibahas sebelumnya.
+    """
+    return (MODEL.version if version is None else version, normalize_input(user_input), context)
+
+def classify_cached(user_input: str) -> 'Detection':
+    """classify_intent backed by RESPONSE_CACHE (keyed on the model version + normalized input)."""
+    detection = RESPONSE_CACHE.get(cache_key(user_input))
+    if detection is None:
+        detection = classify_intent(user_input)
+        observe_stages(DETECTION_STAGES, detection.timings)
+        RESPONSE_CACHE.put(cache_key(user_input, detection.version), detection)
+    return detection
+
+def detect_intent_cached(user_input: str) -> Dict[str, str]:
+    """detect_intent_local backed by RESPONSE_CACHE (keyed on the normalized input)."""
+    return classify_cached(user_input).response
+
+def classify_intents_batch(user_inputs: List[str]) -> List['Detection']:
+    """Classify a batch of utterances in order; duplicate normalized inputs are detected only once.
+
+    Dengan NLP_ENGINE=ngram, semua input unik diklasifikasi sekaligus dengan satu perkalian matriks.
+    """
+    model = MODEL  # satu snapshot untuk seluruh batch
+    keys = [normalize_input(user_input, model) for user_input in user_inputs]
+    first_inputs: Dict[str, str] = {}  # input ternormalisasi -> input asli pertama
+    for key, user_input in zip(keys, user_inputs):
+        first_inputs.setdefault(key, user_input)
+    predictions = predict_intents(list(first_inputs), model) or itertools.repeat(None)
+    detected: Dict[str, Detection] = {
+        key: classify_intent(user_input, model, prediction=prediction)
+        for (key, user_input), prediction in zip(first_inputs.items(), predictions)
+    }
+    return [detected[key] for key in keys]
+
+class ConversationContext(NamedTuple):
+    """Entitas terakhir yang dibahas dalam satu percakapan (disimpan per sesi di ContextStore)"""
+    project: Optional[str] = None
+    tipe: Optional[str] = None
+    lokasi: Optional[str] = None
+
+# Grup kata kunci yang menandai pertanyaan lanjutan tentang proyek yang sedang dibahas
+# ("lokasinya?", "harganya berapa?"); hanya untuk grup ini proyek diisi dari konteks
+FOLLOW_UP_GROUPS = ['info_promo', 'info_harga', 'info_fasilitas', 'info_lokasi', 'lokasi_umum', 'fasilitas_umum']
+# Entitas tipe rumah yang berlaku untuk tiap proyek (selector template harga)
+PROJECT_TYPE_ENTITIES = {'Natureland Kiano 3': 'tipe_kiano3', 'Green Jonggol Village': 'tipe_gjv'}
+
+def apply_context(entities: Dict[str, str], hits: Dict[str, str], context: Optional[ConversationContext],
+                  model: 'NLPModel') -> Optional[ConversationContext]:
+    """Lengkapi entitas yang hilang dari konteks percakapan lalu kembalikan konteks baru.
+
+    entities diubah di tempat. Proyek dari konteks hanya dipakai untuk pertanyaan lanjutan,
+    tipe hanya untuk pertanyaan harga proyek yang sama, dan lokasi hanya untuk rekomendasi.
+    """
+    if context is not None:
+        if ('proyek' not in entities and context.project and is_valid_project(context.project, model)
+                and any(group in hits for group in FOLLOW_UP_GROUPS)):
+            entities['proyek'] = context.project
+            trace(logger, "🧠 Proyek dari konteks percakapan: %s", context.project)
+            type_entity = PROJECT_TYPE_ENTITIES.get(context.project)
+            if context.tipe and type_entity and 'info_harga' in hits and type_entity not in entities:
+                entities[type_entity] = context.tipe
+        if 'lokasi' not in entities and context.lokasi and 'rekomendasi' in hits:
+            entities['lokasi'] = context.lokasi
+            trace(logger, "🧠 Lokasi dari konteks percakapan: %s", context.lokasi)
+
+    previous = context or ConversationContext()
+    project = entities.get('proyek')
+    if project and not is_valid_project(project, model):
+        project = None  # proyek yang tidak ada (ATURAN #7A) tidak diingat
+    project = project or previous.project
+    tipe = entities.get(PROJECT_TYPE_ENTITIES.get(project, ''))
+    if not tipe and project == previous.project:
+        tipe = previous.tipe
+    updated = ConversationContext(project, tipe, entities.get('lokasi') or previous.lokasi)
+    return updated if any(updated) else None
+
+# Tahap di dalam deteksi; urutan ini sama dengan urutan Detection.timings
+DETECTION_STAGES = ('entities', 'rules', 'classifier', 'similarity', 'render')
+
+class _StageTimes(threading.local):
+    """Durasi (detik) tiap tahap deteksi yang sedang berjalan di thread ini"""
+    entities = 0.0
+    classifier = 0.0
+    similarity = 0.0
+    render = 0.0
+
+STAGE_TIMES = _StageTimes()
+
+class Detection(NamedTuple):
+    """Hasil deteksi: aturan yang terpicu (mis. '7C'), intent (None untuk respons statis) dan respons per platform"""
+    rule: str
+    intent: Optional[str]
+    response: Dict[str, str]
+    # Durasi per tahap (detik), urut sesuai DETECTION_STAGES. Ikut dikirim balik dari worker
+    # process sehingga metrik tetap dicatat di proses utama.
+    timings: tuple = ()
+    # Versi NLPModel yang menghasilkan deteksi ini (lihat cache_key)
+    version: int = 0
+    # Konteks percakapan setelah pesan ini (disimpan kembali ke ContextStore oleh pemanggil)
+    context: Optional[ConversationContext] = None
+    # Entitas yang ditemukan lewat koreksi salah ketik (lihat find_fuzzy_entities)
+    corrections: tuple = ()
+
+def classify_intent(user_input: str, model: 'NLPModel' = None, context: ConversationContext = None,
+                    prediction: Optional[IntentPrediction] = None) -> Detection:
+    """Jalankan aturan deteksi intent dan kembalikan Detection (aturan + intent + respons).
+
+    context berisi entitas dari pesan sebelumnya dalam percakapan yang sama (boleh None).
+    prediction: hasil klasifier n-gram yang sudah dihitung per batch (lihat classify_intents_batch).
+    """
+    # Snapshot diambil sekali per request; reload di tengah jalan tidak mengubah hasil request ini
+    model = model or MODEL
+    token = begin_trace(logger)
+    STAGE_TIMES.entities = STAGE_TIMES.classifier = STAGE_TIMES.similarity = STAGE_TIMES.render = 0.0
+    started = time.perf_counter()
+    try:
+        normalized = normalize_message(user_input, model)
+        trace(logger, "🔍 User input: '%s' -> Normalized: '%s'", user_input, normalized.text)
+        rule, intent, response, context, corrections = _run_rules(normalized, model, context, prediction)
+    finally:
+        end_trace(token)
+    total = time.perf_counter() - started
+    entities, classifier, similarity, render = (STAGE_TIMES.entities, STAGE_TIMES.classifier,
+                                                STAGE_TIMES.similarity, STAGE_TIMES.render)
+    timings = (entities, max(total - entities - classifier - similarity - render, 0.0), classifier, similarity, render)
+    return Detection(rule, intent, response, timings, model.version, context, corrections)
+
 def detect_intent_local(user_input: str) -> Dict[str, str]:
     """Detect intent using a final, robust, rule-based priority system."""
-    user_input_normalized = re.sub(r'(\w)\1{2,}', r'\1', user_input.lower().strip())
-    print(f"\n🔍 User input: '{user_input}' -> Normalized: '{user_input_normalized}'")
-
-    entities = detect_entities(user_input)
+    return classify_intent(user_input).response
+
+def _run_rules(normalized: NormalizedText, model: 'NLPModel', context: Optional[ConversationContext] = None,
+               prediction: Optional[IntentPrediction] = None):
+    """Aturan prioritas deteksi intent. Mengembalikan (rule_id, intent, response, konteks baru, koreksi entitas)."""
+    # Entitas dideteksi dari input yang sudah dinormalisasi, sehingga hasil deteksi hanya
+    # bergantung pada input ternormalisasi + konteks (key RESPONSE_CACHE)
+    user_input_normalized = normalized.text
+    started = time.perf_counter()
+    corrections: List[EntityCorrection] = []
+    entities = detect_entities(user_input_normalized, model, corrections, normalized.tokens)
+    STAGE_TIMES.entities = time.perf_counter() - started
+    hits = match_rule_keywords(user_input_normalized, model)
+    context = apply_context(entities, hits, context, model)
+    if NLP_ENGINE == 'ngram' and model.classifier is not None:
+        gated = _apply_rules(user_input_normalized, model, entities, hits, prediction, ENTITY_GATED_RULES)
+        if gated:
+            return (*gated, context, tuple(corrections))
+        classified = _classifier_response(user_input_normalized, model, entities, prediction)
+        if classified:
+            return ('ngram', *classified, context, tuple(corrections))
+    rule, intent, response = _apply_rules(user_input_normalized, model, entities, hits, prediction)
+    return rule, intent, response, context, tuple(corrections)
+
+def _apply_rules(user_input_normalized: str, model: 'NLPModel', entities: Dict[str, str], hits: Dict[str, str],
+                 prediction: Optional[IntentPrediction] = None, only: Optional[frozenset] = None):
+    """Evaluasi tabel aturan (dialogflow_kianoland/rules.json) sesuai prioritas. Mengembalikan (rule_id, intent, response).
+
+    Aturan yang kondisinya cocok tapi tidak menghasilkan respons (mis. intent tanpa template)
+    dilewati dan evaluasi lanjut ke aturan berikutnya. Dengan only, hanya aturan dengan id di
+    dalamnya yang dievaluasi dan None dikembalikan bila tidak ada yang cocok (tanpa fallback).
+    """
     project = entities.get('proyek')
-    lokasi = entities.get('lokasi')
-    tipe_rumah = entities.get('tipe_rumah')
-    tipe_kiano3 = entities.get('tipe_kiano3')
-    tipe_gjv = entities.get('tipe_gjv')
-
-    # Handle Discord-specific !info command explicitly at the beginning if needed
-    if user_input_normalized == '!info':
-        print(f"🎯 ATURAN #0 (Discord Command): '!info' detected. Triggering 'daftar_proyek' intent.")
-        daftar_intent = next((i for i in INTENTS if i['name'] == 'daftar_proyek'), None)
-        if daftar_intent:
-            return format_response(daftar_intent['responses'][0])
-            
-    # ===== NEW ATURAN #1 (INFO KONTAK) - PRIORITAS SANGAT TINGGI UNTUK PERMINTAAN KONTAK EKPLISIT =====
-    kontak_keywords = [
-        'kontak', 'cs', 'customer service', 'admin', 'telepon', 'nomor', 'hubungi', 'hp', 'telp',
-        'contact us', 'bicara dengan orang', 'wa marketing', 'kantor kianoland', 'email kianoland', 'email', 'wa',
-        'berapa nomor', 'nomor berapa', 'nomor telepon', 'nomor hp', 'nomor wa', 'berikan nomor telepon', 
-        'berikan nomor hp', 'telepon kianoland', 'telepon marketing', 'telepon admin',
-        'email marketing', 'email admin'
-    ] 
-    # Pengecualian: jika ada "alamat" yang sangat spesifik, biarkan jatuh ke aturan lokasi.
-    if any(kw in user_input_normalized for kw in kontak_keywords):
-        if 'alamat' in user_input_normalized and ('kantor' in user_input_normalized or 'lokasi' in user_input_normalized):
-            pass # Biarkan jatuh ke aturan lokasi
-        else:
-            kontak_intent = next((i for i in INTENTS if i['name'] == 'info_kontak'), None)
-            if kontak_intent:
-                print("🎯 NEW ATURAN #1 (Info Kontak): Explicit contact request detected. Triggering 'info_kontak' intent.")
-                return format_response(kontak_intent['responses'][0])
-
-    # ===== NEW ATURAN #2 (MINAT BELI) - Paling Prioritas setelah info kontak =====
-    minat_beli_keywords = [
-        'saya ingin beli rumah', 'saya mau booking unit', 'ingin beli rumahnya',
-        'bagaimana cara pembayarannya', 'langkah selanjutnya untuk pembelian apa',
-        'saya minat serius', 'bisa jadwalkan kunjungan ke lokasi',
-        'bagaimana cara bayar booking fee', 'saya siap untuk proses kpr',
-        'hubungkan saya dengan marketing', 'saya mau mulai proses pembelian',
-        'mau beli rumah', 'cara beli rumah di sini gimana', 'saya minat beli',
-        'saya mau ambil satu unit', 'bagaimana cara booking', 'jadwalkan saya untuk survey',
-        'ok saya deal', 'selanjutnya gimana', 'minta kontak salesnya dong',
-        'saya mau lanjut', 'proses lebih lanjut gimana', 'bisa bantu proses pembelian',
-        'gimana proses pembayaran', 'tahapan pembayaran rumah', 'sistem pembayaran di kianoland',
-        'cara pembayaran rumah', 'metode pembayaran', 'tahapan bayar rumah',
-        'langkah-langkah pembelian', 'prosedur pembelian rumahnya gimana', 'jelaskan alur pembelian'
-    ]
-    if any(kw in user_input_normalized for kw in minat_beli_keywords):
-        print(f"🎯 NEW ATURAN #2 (Minat Beli): Explicit buying/process intent keyword detected. Triggering 'minat_beli' intent.")
-        minat_beli_intent = next((i for i in INTENTS if i['name'] == 'minat_beli'), None)
-        if minat_beli_intent:
-            return format_response(minat_beli_intent['responses'][0])
-
-    # ===== NEW ATURAN #3 (SYARAT DOKUMEN) - Prioritas Tinggi setelah minat beli =====
-    syarat_dokumen_keywords = [
-        'syarat', 'persyaratan', 'dokumen', 'kpr', 'berkas', 'prosedur kredit',
-        'proses kredit pemilikan rumah', 'saya perlu siapkan apa saja untuk beli rumah'
-    ]
-    if any(kw in user_input_normalized for kw in syarat_dokumen_keywords):
-        print(f"🎯 NEW ATURAN #3 (Syarat Dokumen): Explicit document requirement keyword detected. Triggering 'syarat_dokumen' intent.")
-        syarat_dokumen_intent = next((i for i in INTENTS if i['name'] == 'syarat_dokumen'), None)
-        if syarat_dokumen_intent:
-            return format_response(syarat_dokumen_intent['responses'][0])
-
-    # ===== NEW ATURAN #4 (Bantuan/Help) - Setelah yang lebih spesifik =====
-    help_keywords = ['bantuan', 'panduan', 'cara pakai', 'menu', 'apa saja yang bisa ditanyakan', 'saya perlu bantuan', 'tolong bantu saya', 'bagaimana cara menggunakan bot ini', 'saya butuh panduan', 'tutorial penggunaan', 'tolong', 'bantu', 'saya tidak mengerti', 'saya tidak paham', 'ga ngerti', 'gimana caranya', 'cara penggunaan', 'mau tanya', 'bisa tanya apa', 'fitur apa saja', 'help', 'assist', 'saya bingung', 'bingung', 'petunjuk', 'instruksi', 'cara bertanya', 'gimana nanya', 'bantu saya', 'aku tidak paham fungsi nya']
-    if any(kw in user_input_normalized for kw in help_keywords):
-        print(f"🎯 NEW ATURAN #4 (Help/Bantuan): Explicit help keyword detected. Triggering 'bantuan' intent.")
-        bantuan_intent = next((i for i in INTENTS if i['name'] == 'bantuan'), None)
-        if bantuan_intent:
-            return format_response(bantuan_intent['responses'][0])
-
-    # ===== NEW ATURAN #5 (DAFTAR PROYEK) - Prioritas tinggi, setelah fungsional inti dan sebelum welcome =====
-    strong_daftar_proyek_keywords = [
-        'daftar proyek', 'proyek apa saja', 'list proyek', 'semua proyek',
-        'perumahan apa yang ada', 'pilihan proyek', 'proyek yang tersedia',
-        'daftar rumah', 'berikan saya daftar rumah', 'daftar perumahan', 
-        'berikan saya daftar perumahan', 'apa saja proyek kianoland', 
-        'properti apa yang tersedia', 'list perumahan', 'tampilkan proyek', 
-        'pilihan rumah', 'semua proyek', 'katalog proyek', 'rumah apa saja yang dijual', 
-        'proyek yang masih tersedia', 'project yang ada di kianoland',
-        'saya ingin lihat proyek yang ada', 'saya ingin lihat lihat', 'saya ingin lihat project', 
-        'saya ingin lihat rumah yang ada', 'ada rumah apa aja',
-        'berikan saya list project nya', 'berikan saya list proyek nya', 
-        'saya mau lihat', 'saya mau lihat rumah', 'mau lihat rumah', 'lihat properti', 
-        'nama proyeknya apa', # Tambahkan ini untuk mencocokkan "Nama proyeknya apa?"
-        'produk apa yang dijual oleh kianoland group', # Tambahkan ini untuk mencocokkan "Produk apa yang dijual oleh Kianoland Group?"
-        'produk kianoland group', 'apa saja produk kianoland', 'properti di kianoland group',
-        'kasih lihat dong pilihan rumahnya', 'ada pilihan properti apa aja', 
-        'mau cek proyek yang ready', 'saya mau tahu produknya', # Tambahkan ini untuk mencocokkan "Saya mau tahu produknya"
-        'kalian jual rumah apa aja',
-        'info properti', 'informasi properti', # Info eksplisit untuk properti
-        'info', 'informasi', 'rumah', 'properti', 'perumahan', # Kata kunci info umum yang mungkin masuk ke sini
-        'tampilkan proyek', 'lihat daftar', 'lihat proyek', # Menambahkan frasa "lihat" yang lebih umum
-        'saya ingin lihat-lihat', # Menambahkan frasa gagal yang persis lagi agar lebih kuat
-        'nama proyek', 'produk apa' # Menambahkan untuk "Nama proyeknya apa?" dan "Produk apa yang dijual..."
-    ]
-
-    # Pastikan bagian ini berada di atas ATURAN #6 (Welcome Intent)
-    for keyword in strong_daftar_proyek_keywords:
-        # Menggunakan re.search dengan word boundary untuk pencocokan yang lebih tepat
-        if re.search(r'\b' + re.escape(keyword) + r'\b', user_input_normalized):
-            print(f"🎯 NEW ATURAN #5 (General List): Strong keyword '{keyword}' for 'daftar_proyek' detected. Triggering 'daftar_proyek' intent.")
-            daftar_intent = next((i for i in INTENTS if i['name'] == 'daftar_proyek'), None)
-            if daftar_intent:
-                return format_response(daftar_intent['responses'][0])
-
-    # ===== NEW ATURAN #6 (Welcome/Greeting) - Paling bawah setelah semua intent fungsional =====
-    # Pastikan ini berada di bawah ATURAN #5
-    welcome_keywords_refined = [
-        'halo', 'hi', 'hai', 'selamat pagi', 'selamat siang', 'selamat sore', 'selamat malam',
-        'assalamualaikum', 'permisi', 'p', 'pe', 'mulai', '/mulai', 'start', '/start',
-        'apa kabar', 'hai bot', 'hello kianoland', 'awali chat', 'bagaimana hari ini', 
-        'bot', 'kianoland bot', 'kianoland group', 'saya baru di sini', 'perkenalkan diri',
-        'siapa anda', 'ada yang bisa saya bantu', 'apakah ada yang bisa saya bantu hari ini'
-    ] 
-    if any(kw in user_input_normalized for kw in welcome_keywords_refined): # Gunakan daftar yang sudah disaring
-        print(f"🎯 NEW ATURAN #6 (Welcome): Greeting keyword detected. Triggering 'welcome' intent.")
-        welcome_intent = next((i for i in INTENTS if i['name'] == 'welcome'), None)
-        if welcome_intent:
-            return format_response(welcome_intent['responses'][0])
-
-    # ===== ATURAN #7: Prioritaskan pertanyaan yang mengandung nama proyek =====
-    if project:
-        # ===== ATURAN #7A: TANGANI PROYEK YANG TIDAK ADA SAMA SEKALI (contoh: Kiano 4) =====
-        if not is_valid_project(project):
-            print(f"🎯 ATURAN #7A: Unknown project '{project}' detected.")
-            return format_response(
-                f"Maaf, proyek '{project}' tidak ada atau tidak tersedia di Kianoland Group.\n\n"
-                f"Proyek yang tersedia saat ini:\n• Natureland Kiano 3\n• Green Jonggol Village"
-            )
-            
-        # ===== ATURAN #7B: TANGANI PROYEK YANG ADA TAPI SUDAH SOLD OUT (contoh: Kiano 1) =====
-        sold_out_projects = ["Natureland Kiano 1", "Natureland Kiano 2"]
-        is_asking_specific_info = any(
-            kw in user_input_normalized for kw in ['lokasi', 'alamat', 'peta', 'letak', 'harga', 'cicilan', 'promo', 'fasilitas', 'syarat']
-        )
-        if project in sold_out_projects and not is_asking_specific_info:
-            print(f"🎯 ATURAN #7B: Sold Out Project '{project}' detected and no specific info requested.")
-            return format_response(
-                f"Maaf, proyek {project} sudah sold out. Kami merekomendasikan proyek terbaru kami:\n\n"
-                f"🏡 Natureland Kiano 3 (Cibarusah, Bekasi)\n🌳 Green Jonggol Village (Jonggol, Bogor)\n\n"
-                f"Ketik 'info [nama_proyek]' untuk detail lebih lanjut."
-            )
-            
-        # ===== ATURAN #7C: PERTANYAAN SPESIFIK BERDASARKAN KATA KUNCI (dengan proyek terdeteksi) =====
-        specific_keywords_map = {
-            'info_promo': ['promo', 'diskon', 'dp', 'uang muka'],
-            'info_harga': ['harga', 'cicilan', 'angsuran', 'biaya', 'pl', 'pricelist'],
-            'info_fasilitas': ['fasilitas'],
-            'info_lokasi': ['lokasi', 'alamat', 'peta', 'letak'],
-        }
+    project_valid = bool(project) and is_valid_project(project, model)
+    for rule in candidate_rules(model.rules, hits):
+        if only is not None and rule.id not in only:
+            continue
+        if not condition_matches(rule.condition, user_input_normalized, entities, hits, project_valid):
+            continue
+        if rule.similarity:
+            # ===== ATURAN #14: PENCOCOKAN KEMIRIPAN UMUM (FALLBACK jika tidak ada yang lebih spesifik) =====
+            trace(logger, "🚦 Proceeding to Rule #%s: Similarity-based matching. User input: '%s'", rule.id, user_input_normalized)
+            if NLP_ENGINE == 'hybrid' and model.classifier is not None:
+                classified = _classifier_response(user_input_normalized, model, entities, prediction)
+                if classified:
+                    return ('ngram', *classified)
+            started = time.perf_counter()
+            similar_match = find_similar_phrase(user_input_normalized, model)
+            STAGE_TIMES.similarity += time.perf_counter() - started
+            if similar_match:
+                best_match, highest_score, phrase = similar_match
+                trace(logger, "🎯 Best match by similarity: %s (score: %.2f) with phrase: '%s'", best_match['name'], highest_score, phrase)
+                response = render_template(best_match['name'], project, entities.get('lokasi'), model=model)
+                if response:
+                    return rule.id, best_match['name'], response
+            continue
 
-        # Check for specific project info (including types like subsidi/komersil) FIRST
-        if project == 'Natureland Kiano 3' and tipe_kiano3:
-            print(f"🎯 ATURAN #7C (Specific Kiano 3 Type Info): Project '{project}' and Type '{tipe_kiano3}' Detected.")
-            info_intent = next((i for i in INTENTS if i['name'] == 'info_proyek'), None)
-            if info_intent:
-                response_text = process_conditional_templates(info_intent['responses'][0], project=project, primary=tipe_kiano3)
-                return format_response(response_text)
-        elif project == 'Green Jonggol Village' and tipe_gjv: # NEW: Handle GJV specific types
-            print(f"🎯 ATURAN #7C (Specific GJV Type Info): Project '{project}' and Type '{tipe_gjv}' Detected.")
-            info_intent = next((i for i in INTENTS if i['name'] == 'info_proyek'), None)
-            if info_intent:
-                response_text = process_conditional_templates(info_intent['responses'][0], project=project, primary=tipe_gjv)
-                return format_response(response_text)
-        
-        # Now, proceed with other specific keywords
-        for intent_name, keywords in specific_keywords_map.items():
-            if any(kw in user_input_normalized for kw in keywords):
-                print(f"🎯 ATURAN #7C: Specific Intent '{intent_name}' with Project '{project}' Detected.")
-                
-                # Special handling for info_harga based on project and specific types
-                if intent_name == 'info_harga':
-                    primary_key = None
-                    if project == 'Green Jonggol Village':
-                        if tipe_gjv: 
-                            primary_key = tipe_gjv
-                        elif 'subsidi' in user_input_normalized: primary_key = 'GJV_subsidi'
-                        elif 'komersil' in user_input_normalized: primary_key = 'GJV_komersil'
-                        
-                        if tipe_rumah and not primary_key:
-                            if tipe_rumah == '30/60': primary_key = 'GJV_subsidi'
-                            elif tipe_rumah == '36/72': primary_key = 'GJV_komersil'
-                            else:
-                                return format_response(f"Maaf, tipe rumah {tipe_rumah} tidak tersedia di Green Jonggol Village.\nTipe yang tersedia: 30/60 (Subsidi) & 36/72 (Komersil).")
-
-                    elif project == 'Natureland Kiano 3':
-                        if tipe_kiano3: 
-                            primary_key = tipe_kiano3
-                        elif '40/60' in user_input_normalized or '1 lantai' in user_input_normalized: primary_key = 'K3_1_Lantai'
-                        elif '60/60' in user_input_normalized or 'mezzanine' in user_input_normalized or '1.5 lantai' in user_input_normalized: primary_key = 'K3_Mezzanine'
-                        elif '90/60' in user_input_normalized or '2 lantai' in user_input_normalized: primary_key = 'K3_2_Lantai'
-                    
-                    forced_intent = next((i for i in INTENTS if i['name'] == 'info_harga'), None)
-                    if forced_intent:
-                        response_text = process_conditional_templates(forced_intent['responses'][0], project=project, primary=primary_key)
-                        return format_response(response_text)
-                
-                # Logika umum untuk intent spesifik lainnya (dengan proyek)
-                if intent_name != 'info_proyek': 
-                    forced_intent = next((i for i in INTENTS if i['name'] == intent_name), None)
-                    if forced_intent:
-                        response_text = process_conditional_templates(forced_intent['responses'][0], project, lokasi)
-                        return format_response(response_text)
-
-        # ===== ATURAN #7D: INFO PROYEK VALID (catch-all for "info [project]" or just "[project]") =====
-        general_info_keywords = ['info', 'informasi', 'detail', 'tentang', 'apa itu', 'apakah', 'ada']
-        if project and (
-            any(kw in user_input_normalized for kw in general_info_keywords) or 
-            not any(kw in user_input_normalized for kw in sum(specific_keywords_map.values(), [])) 
-        ):
-            print(f"🎯 ATURAN #7D: General Info Request for Valid Project '{project}'.")
-            info_intent = next((i for i in INTENTS if i['name'] == 'info_proyek'), None)
-            if info_intent:
-                response_text = process_conditional_templates(info_intent['responses'][0], project=project, primary=project)
-                return format_response(response_text)
-
-
-    # ===== ATURAN FALLBACK (Jika tidak ada proyek spesifik yang terdeteksi) =====
-
-    # ===== ATURAN #8: General Info Harga (tanpa proyek spesifik) =====
-    general_harga_keywords = ['harga', 'cicilan', 'angsuran', 'biaya', 'pl', 'pricelist']
-    if any(kw in user_input_normalized for kw in general_harga_keywords) and not project:
-        print("🎯 ATURAN #8: General Price/Pricelist Request Detected (no project).")
-        return format_response(
-            "Untuk proyek mana Anda ingin melihat pricelist?\n"
-            "Misal: 'harga Natureland Kiano 3' atau 'pricelist Green Jonggol Village'."
-        )
-
-    # ===== ATURAN #9: General Info Lokasi (tanpa proyek spesifik) =====
-    general_lokasi_keywords = ['lokasi', 'alamat', 'peta', 'letak', 'dimana', 'lihat lokasi']
-    # Pengecualian: jika ada "kantor" (tanpa "alamat") maka biarkan jatuh ke info_kontak
-    if any(kw in user_input_normalized for kw in general_lokasi_keywords):
-        if 'kantor' in user_input_normalized and 'alamat' not in user_input_normalized:
-            pass # Biarkan jatuh ke info_kontak jika hanya "kantor" tanpa "alamat"
+        trace(logger, "🎯 ATURAN #%s: %s", rule.id, rule.description)
+        if rule.static is not None:
+            return rule.id, rule.intent, static_response(format_static(rule.static, entities))
+        if rule.template is not None:
+            response = render_template(rule.intent, **resolve_args(rule.template, entities), model=model)
         else:
-            print(f"🎯 ATURAN #9: General Location Request Detected (no project).")
-            return format_response(
-                "Tentu, lokasi untuk proyek mana yang ingin Anda ketahui?\n\n"
-                "Proyek yang tersedia:\n"
-                "• Natureland Kiano 3\n"
-                "• Green Jonggol Village"
-            )
-    
-    # ===== ATURAN #10: General Info Fasilitas (tanpa proyek spesifik) =====
-    general_fasilitas_keywords = ['fasilitas', 'fasilitasnya apa', 'apa fasilitasnya']
-    if any(kw in user_input_normalized for kw in general_fasilitas_keywords) and not project:
-        print(f"🎯 ATURAN #10: General Facility Request Detected (no project).")
-        return format_response(
-            "Tentu, informasi fasilitas untuk proyek mana yang ingin Anda ketahui?\n\n"
-            "Proyek yang tersedia:\n"
-            "• Natureland Kiano 3\n"
-            "• Green Jonggol Village"
-        )
-
-    # ===== ATURAN #11: General Promo Request (if no project mentioned) =====
-    general_promo_keywords = ['promo', 'diskon', 'dp', 'uang muka']
-    if any(kw in user_input_normalized for kw in general_promo_keywords) and not project:
-        print(f"🎯 ATURAN #11: General Promo Request Detected (no project).")
-        promo_intent = next((i for i in INTENTS if i['name'] == 'info_promo'), None)
-        if promo_intent:
-            response_text = process_conditional_templates(promo_intent['responses'][0], project='all_promos')
-            return format_response(response_text)
-
-
-    # ===== ATURAN #12: RUMAH SUBSIDI & KOMERSIL (if no specific project was given) =====
-    if ('subsidi' in user_input_normalized or 'komersil' in user_input_normalized) and not project:
-        project_for_subsidi_komersil = "Green Jonggol Village"
-        info_intent = next((i for i in INTENTS if i['name'] == 'info_proyek'), None)
-        if info_intent:
-            intro_text = "Untuk rumah subsidi, kami merekomendasikan **Green Jonggol Village**.\n\nBerikut informasinya:\n" if 'subsidi' in user_input_normalized else "Untuk rumah komersil, kami merekomendasikan **Green Jonggol Village**.\n\nBerikut informasinya:\n"
-            primary_key_for_gjv = 'GJV_subsidi' if 'subsidi' in user_input_normalized else 'GJV_komersil'
-            processed_response = process_conditional_templates(info_intent['responses'][0], project=project_for_subsidi_komersil, primary=primary_key_for_gjv)
-            return format_response(intro_text + processed_response)
-
-
-    # ===== ATURAN #13: REKOMENDASI LOKASI =====
-    rekomendasi_keywords = ['rekomendasi', 'rekom', 'sarankan', 'saran', 'cocok', 'hunian', 'cari', 'ada apa', 'pilihan']
-    if lokasi and any(kw in user_input_normalized for kw in rekomendasi_keywords):
-        print(f"🎯 ATURAN #13A: Recommendation for Known Location '{lokasi}' detected.")
-        rekomendasi_intent = next((i for i in INTENTS if i['name'] == 'rekomendasi_proyek'), None) 
-        if rekomendasi_intent:
-            response_text = process_conditional_templates(rekomendasi_intent['responses'][0], lokasi=lokasi)
-            return format_response(response_text)
-    elif any(kw in user_input_normalized for kw in rekomendasi_keywords):
-        print("🎯 ATURAN #13B: General Recommendation Request (no location). Triggering 'daftar_proyek' intent.")
-        daftar_intent = next((i for i in INTENTS if i['name'] == 'daftar_proyek'), None)
-        if daftar_intent:
-            return format_response(daftar_intent['responses'][0])
-            
-    # ===== ATURAN #14: PENCOCOKAN KEMIRIPAN UMUM (FALLBACK jika tidak ada yang lebih spesifik) =====
-    print(f"🚦 Proceeding to Rule #14: Similarity-based matching. User input: '{user_input_normalized}'")
-    best_match = None
-    highest_score = 0.75 
-    for intent in INTENTS:
-        # Exclude already handled high-priority intents from similarity matching
-        if intent['name'] in [
-            'default_fallback', 'info_promo', 'info_harga', 'info_lokasi', 'info_fasilitas',
-            'syarat_dokumen', 'rekomendasi_proyek', 'minat_beli', 'info_kontak', 'bantuan', 'daftar_proyek', 'welcome'
-            ]: 
-            continue
-        
-        for phrase in intent.get('phrases', []):
-            similarity = SequenceMatcher(None, user_input_normalized, phrase).ratio()
-            if similarity > highest_score:
-                highest_score = similarity
-                best_match = intent
-                print(f"   - Found better similarity match: {best_match['name']} ({highest_score:.2f}) with phrase: '{phrase}'")
-    
-    if best_match:
-        print(f"🎯 Best match by similarity: {best_match['name']} (score: {highest_score:.2f})")
-        response_text = process_conditional_templates(best_match['responses'][0], project, lokasi)
-        return format_response(response_text)
-
-
-    # ===== ATURAN #15: FALLBACK TERAKHIR (If no other rule fires) =====
-    print("🛑 Final Fallback.")
-    fallback_intent = next((i for i in INTENTS if i['name'] == 'default_fallback'), None)
-    if fallback_intent:
-        return format_response(fallback_intent['responses'][0])
-    return format_response("Maaf, saya tidak dapat memproses permintaan Anda saat ini.")
+            response = model.intent_responses.get(rule.intent)
+        if response:
+            return rule.id, rule.intent, response
+
+    if only is not None:
+        return None
+    # Tabel aturan tidak punya fallback yang berhasil
+    trace(logger, "🛑 Final Fallback.")
+    return '15', None, static_response("Maaf, saya tidak dapat memproses permintaan Anda saat ini.")
 
 def process_conditional_templates(text: str, project: str = None, lokasi: str = None, primary: str = None, secondary: str = None) -> str:
     """Process conditional templates with intelligent block selection based on project or location."""
@@ -580,5 +733,202 @@ def format_response(text: str) -> Dict[str, str]:
         'web': text.replace('**', '').replace('bold_start', '<strong>').replace('bold_end', '</strong>')
     }
 
+# ===== TABEL RESPONS =====
+# Semua respons intent dirender sekali saat model dibangun, per (intent, selector), lengkap dengan
+# varian raw/discord/telegram/web. Saat request cukup lookup dictionary.
+# Dictionary respons dipakai bersama antar request, jadi jangan dimodifikasi oleh pemanggil.
+TEMPLATE_SELECTOR_PATTERN = re.compile(r'\{\{#([^}]+)\}\}')
+# Penanda untuk mendeteksi blok yang masih bergantung pada {{proyek}} / {{lokasi}}
+_PLACEHOLDER_PROBE = '\x00'
+
+def build_response_table(intents: List[dict]) -> tuple:
+    """Prebuild the per-platform response of every (intent, selector) pair.
+
+    Returns (intent_responses, response_table, template_selectors, dynamic_templates, template_texts):
+    - intent_responses: intent -> respons pertama tanpa pemrosesan template
+    - response_table: (intent, selector) -> respons per platform
+    - template_selectors: intent -> selector yang punya blok {{#selector}}
+    - dynamic_templates: (intent, selector) -> teks template yang memakai {{proyek}}/{{lokasi}}
+    - template_texts: intent -> teks template mentah
+    """
+    intent_responses, table, selectors, dynamic, texts = {}, {}, {}, {}, {}
+    for intent in intents:
+        if not intent['responses']:
+            continue
+        name, text = intent['name'], intent['responses'][0]
+        texts[name] = text
+        intent_responses[name] = format_response(text)
+        selectors[name] = set(TEMPLATE_SELECTOR_PATTERN.findall(text))
+        # Selector None mewakili semua selector yang tidak punya blok sendiri (all_promos/fallback/tanpa tag)
+        for selector in selectors[name] | {None}:
+            probe = process_conditional_templates(
+                text, project=_PLACEHOLDER_PROBE, lokasi=_PLACEHOLDER_PROBE, primary=selector or _PLACEHOLDER_PROBE
+            )
+            if _PLACEHOLDER_PROBE in probe:
+                dynamic[(name, selector)] = text
+            else:
+                table[(name, selector)] = format_response(process_conditional_templates(text, primary=selector))
+    logger.info("✅ Prebuilt %d template responses", len(table))
+    return intent_responses, table, selectors, dynamic, texts
+
+def render_template(intent_name: str, project: str = None, lokasi: str = None, primary: str = None, intro: str = None,
+                    model: 'NLPModel' = None) -> Optional[Dict[str, str]]:
+    """Lookup the prebuilt response of an intent template (same selection rules as process_conditional_templates)."""
+    started = time.perf_counter()
+    try:
+        return _lookup_template(model or MODEL, intent_name, project, lokasi, primary, intro)
+    finally:
+        STAGE_TIMES.render += time.perf_counter() - started
+
+def _lookup_template(model: 'NLPModel', intent_name: str, project: str, lokasi: str, primary: str, intro: str) -> Optional[Dict[str, str]]:
+    selector = primary or project or lokasi
+    if selector not in model.template_selectors.get(intent_name, ()):
+        selector = None
+    key = (intent_name, selector)
+    if key in model.dynamic_templates:
+        # Blok yang memakai {{proyek}}/{{lokasi}} tetap dirender per request
+        return format_response((intro or '') + process_conditional_templates(model.dynamic_templates[key], project, lokasi, primary))
+    if key not in model.response_table:
+        return None
+    if intro:
+        return _render_with_intro(model, intent_name, selector, intro)
+    return model.response_table[key]
+
+@lru_cache(maxsize=64)
+def _render_with_intro(model: 'NLPModel', intent_name: str, selector: Optional[str], intro: str) -> Dict[str, str]:
+    return format_response(intro + process_conditional_templates(model.template_texts[intent_name], primary=selector))
+
+@lru_cache(maxsize=256)
+def static_response(text: str) -> Dict[str, str]:
+    """format_response for fixed rule messages, memoized"""
+    return format_response(text)
+
+# ===== MODEL SNAPSHOT =====
+@dataclass(frozen=True, eq=False)
+class NLPModel:
+    """Snapshot model NLP yang sudah dikompilasi: intent, entitas dan semua indeks turunannya.
+
+    Dibangun lengkap oleh build_model() lalu dipasang dengan satu assignment (swap_model),
+    sehingga request tidak pernah melihat model setengah jadi dan tidak perlu lock. Request
+    yang sedang berjalan tetap memakai snapshot lamanya sampai selesai. Isi snapshot
+    dipakai bersama antar thread, jadi jangan dimodifikasi setelah dibangun.
+    """
+    version: int
+    fingerprint: tuple
+    loaded_at: float
+    intents: tuple
+    entities: Dict[str, list]
+    phrase_entries: List[tuple]
+    phrase_index: Dict[str, List[int]]
+    phrase_max_length: int
+    entity_matcher: KeywordMatcher
+    valid_project_names: frozenset
+    normalizer: Normalizer
+    fuzzy_matcher: FuzzyMatcher
+    classifier: Optional[NgramClassifier]  # None bila numpy tidak tersedia
+    rule_matcher: KeywordMatcher
+    rules: RuleSet
+    intent_responses: Dict[str, Dict[str, str]]
+    response_table: Dict[tuple, Dict[str, str]]
+    template_selectors: Dict[str, set]
+    dynamic_templates: Dict[tuple, str]
+    template_texts: Dict[str, str]
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "intents": len(self.intents),
+            "entities": len(self.entities),
+            "phrases": len(self.phrase_entries),
+            "responses": len(self.response_table),
+            "rules": len(self.rules.rules),
+            "engine": NLP_ENGINE if self.classifier is not None else 'rules',
+        }
+
+_model_versions = itertools.count(1)
+
+def source_fingerprint(folder: str = DIALOGFLOW_FOLDER) -> tuple:
+    """(jumlah file, mtime terbaru, total ukuran) semua file JSON di folder data, untuk deteksi perubahan"""
+    count, latest, size = 0, 0, 0
+    for root, _, files in os.walk(folder):
+        for filename in files:
+            if filename.endswith('.json'):
+                stat = os.stat(os.path.join(root, filename))
+                count, latest, size = count + 1, max(latest, stat.st_mtime_ns), size + stat.st_size
+    return count, latest, size
+
+def build_model(folder: str = DIALOGFLOW_FOLDER) -> NLPModel:
+    """Muat intent & entitas dari folder data lalu kompilasi semua indeks menjadi NLPModel baru"""
+    # Fingerprint diambil sebelum file dibaca: perubahan selama proses build memicu reload berikutnya
+    fingerprint = source_fingerprint(folder)
+    normalizer = build_normalizer(folder)
+    intents = load_intents(os.path.join(folder, "intents"), normalizer)
+    entities = load_entities(os.path.join(folder, "entities"))
+    phrase_entries, phrase_index, phrase_max_length = build_phrase_index(intents)
+    entity_matcher, valid_project_names = build_entity_index(entities, normalizer)
+    intent_responses, response_table, template_selectors, dynamic_templates, template_texts = build_response_table(intents)
+    rule_table = load_rule_table(os.path.join(folder, RULES_FILE))
+    rules = compile_rules(rule_table, (intent['name'] for intent in intents))
+    logger.info("✅ Compiled %d rules", len(rules.rules))
+    return NLPModel(
+        version=next(_model_versions),
+        fingerprint=fingerprint,
+        loaded_at=time.time(),
+        intents=tuple(intents),
+        entities=entities,
+        phrase_entries=phrase_entries,
+        phrase_index=phrase_index,
+        phrase_max_length=phrase_max_length,
+        entity_matcher=entity_matcher,
+        valid_project_names=valid_project_names,
+        normalizer=normalizer,
+        fuzzy_matcher=build_fuzzy_index(entities, intents, rule_table['keyword_groups'], normalizer),
+        classifier=build_intent_classifier(intents),
+        rule_matcher=build_rule_matcher(rule_table['keyword_groups'], normalizer),
+        rules=rules,
+        intent_responses=intent_responses,
+        response_table=response_table,
+        template_selectors=template_selectors,
+        dynamic_templates=dynamic_templates,
+        template_texts=template_texts,
+    )
+
+def model_source_hash(folder: str = DIALOGFLOW_FOLDER) -> str:
+    """Hash isi data + kode kompilasi; artifact dengan hash berbeda dianggap basi"""
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    code_files = [os.path.abspath(__file__)] + [os.path.join(backend_dir, name) for name in ("keyword_matcher.py", "rule_table.py", "fuzzy_matcher.py", "ngram_classifier.py", "text_normalizer.py")]
+    return source_hash(folder, code_files)
+
+def save_model_artifact(model: NLPModel, path: str = MODEL_ARTIFACT_PATH, source: str = None):
+    write_artifact(path, model, source or model_source_hash())
+
+def load_model_artifact(path: str = MODEL_ARTIFACT_PATH) -> Optional[NLPModel]:
+    """Muat NLPModel dari artifact biner di MODEL_BUILD_DIR. None jika tidak ada, basi, atau rusak."""
+    if not path:
+        return None
+    started = time.perf_counter()
+    try:
+        model = read_artifact(path, model_source_hash(), MODEL_BUILD_DIR)
+    except Exception:
+        logger.exception("Model artifact %s tidak bisa dibaca, memuat dari JSON", path)
+        return None
+    if model is None:
+        return None
+    logger.info("✅ Loaded model artifact %s in %.1f ms", path, (time.perf_counter() - started) * 1000)
+    return replace(model, version=next(_model_versions), fingerprint=source_fingerprint(), loaded_at=time.time())
+
+MODEL: NLPModel = None
+
+def swap_model(model: NLPModel):
+    """Pasang snapshot model baru secara atomik (satu assignment global)"""
+    global MODEL
+    MODEL = model
+    # Entri cache lama tidak akan cocok lagi (versi model ada di key); kosongkan agar memori bebas
+    RESPONSE_CACHE.clear()
+    _render_with_intro.cache_clear()
+    logger.info("✅ NLP model v%d active", model.version)
+
 # Initialize on import
-load_resources()
\ No newline at end of file
+if os.getenv(LOAD_ON_IMPORT_ENV, "true").lower() not in ("0", "false", "no", "off"):
+    load_resources()
\ No newline at end of file
@@ -0,0 +1,124 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+from typing import Optional
+
+# Trace aturan (level DEBUG) hanya ditulis untuk sebagian request (LOG_TRACE_SAMPLE_RATE)
+_trace_active: contextvars.ContextVar = contextvars.ContextVar("kianoland_trace", default=False)
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Satu baris JSON per record. Field tambahan dikirim lewat extra={"fields": {...}}"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            payload.update(fields)
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler yang membuang record (dan menghitungnya) bila antrean penuh, alih-alih memblokir"""
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Format pesan di thread pemanggil agar args tidak perlu dipickle/diakses ulang,
+        # tapi biarkan serialisasi JSON dikerjakan thread listener
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+def configure_logging():
+    """Pasang logger "kianoland": handler antrean + thread listener yang menulis ke stdout.
+
+    Aman dipanggil berkali-kali (hanya dikonfigurasi sekali per proses).
+    - LOG_LEVEL: level minimum (default INFO)
+    - LOG_FORMAT: json (default) atau text
+    - LOG_QUEUE_SIZE: kapasitas antrean sebelum record dibuang
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    else:
+        stream_handler.setFormatter(JsonFormatter())
+
+    log_queue: queue.Queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_stop_listener)
+
+    logger = logging.getLogger("kianoland")
+    logger.handlers = [DroppingQueueHandler(log_queue)]
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+    os.register_at_fork(after_in_child=_restart_listener_in_child)
+
+
+def _stop_listener():
+    # Listener yang aktif di proses ini (setelah fork bukan lagi milik induk)
+    _listener.stop()
+
+
+def _restart_listener_in_child():
+    """Setelah fork (gunicorn preload) thread listener tidak ikut ke proses anak: buat antrean
+    dan listener baru. Antrean lama tidak dipakai lagi karena lock-nya bisa saja sedang dipegang
+    thread listener induk saat fork terjadi.
+    """
+    global _listener
+    if _listener is None:
+        return
+    log_queue: queue.Queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+    _listener = logging.handlers.QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+    for handler in logging.getLogger("kianoland").handlers:
+        if isinstance(handler, DroppingQueueHandler):
+            handler.queue = log_queue
+
+
+def begin_trace(logger: logging.Logger) -> contextvars.Token:
+    """Tentukan (dengan sampling) apakah trace DEBUG request ini ditulis"""
+    sample_rate = float(os.getenv("LOG_TRACE_SAMPLE_RATE", "0.01"))
+    active = logger.isEnabledFor(logging.DEBUG) and random.random() < sample_rate
+    return _trace_active.set(active)
+
+
+def end_trace(token: contextvars.Token):
+    _trace_active.reset(token)
+
+
+def trace(logger: logging.Logger, msg: str, *args):
+    """logger.debug yang hanya aktif untuk request yang terpilih sampling"""
+    if _trace_active.get():
+        logger.debug(msg, *args)
+
+
+def elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 3)
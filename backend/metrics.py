@@ -0,0 +1,253 @@
+import json
+import os
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Batas bucket histogram latensi (detik): dari puluhan mikrodetik (tahap deteksi)
+# sampai beberapa detik (kirim pesan ke Telegram/Discord)
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+REGISTRY: List['_Metric'] = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], le: str = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value))
+
+
+class _Metric:
+    """Dasar metrik yang di-shard per thread.
+
+    Setiap thread menulis ke dict miliknya sendiri (tanpa lock di jalur panas); lock hanya
+    dipakai sekali per thread saat shard didaftarkan. Nilai dijumlahkan saat /metrics dibaca.
+    """
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            self._local.shard = shard
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshots(self) -> List[dict]:
+        with self._lock:
+            shards = list(self._shards)
+        # dict.copy() atomik terhadap GIL, jadi aman walau thread pemilik sedang menulis
+        return [shard.copy() for shard in shards]
+
+    def render(self, totals: Optional[dict] = None) -> List[str]:
+        """Baris teks Prometheus; totals = hasil gabungan beberapa proses (default: proses ini)"""
+        totals = self.totals() if totals is None else totals
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"] + self._samples(totals)
+
+    def totals(self) -> dict:
+        raise NotImplementedError
+
+    def merge(self, totals: dict, other: dict):
+        """Tambahkan totals proses lain ke totals (in-place)"""
+        raise NotImplementedError
+
+    def _samples(self, totals: dict) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, *labels: str, value: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + value
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        totals: Dict[Tuple[str, ...], float] = {}
+        for snapshot in self._snapshots():
+            self.merge(totals, snapshot)
+        return totals
+
+    totals = values
+
+    def merge(self, totals: dict, other: dict):
+        for labels, value in other.items():
+            totals[labels] = totals.get(labels, 0) + value
+
+    def _samples(self, totals: dict) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(totals.items())
+        ]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str):
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # [hitungan per bucket (non-kumulatif) ..., +Inf, sum]
+            state = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def totals(self) -> Dict[Tuple[str, ...], list]:
+        totals: Dict[Tuple[str, ...], list] = {}
+        for snapshot in self._snapshots():
+            self.merge(totals, snapshot)
+        return totals
+
+    def merge(self, totals: dict, other: dict):
+        for labels, state in other.items():
+            total = totals.setdefault(labels, [0] * len(state))
+            for i, value in enumerate(list(state)):
+                total[i] += value
+
+    def _samples(self, totals: dict) -> List[str]:
+        lines = []
+        for labels, state in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Gauge yang nilainya dibaca dari callback saat /metrics diminta (mis. ukuran cache).
+
+    Nilai gauge milik satu proses, jadi saat digabung antar worker tiap nilai diberi label pid
+    (tidak dijumlahkan).
+    """
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float]):
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def totals(self) -> dict:
+        return {(): self.callback()}
+
+    def merge(self, totals: dict, other: dict):
+        totals.update(other)
+
+    def _samples(self, totals: dict) -> List[str]:
+        names = ("pid",) if any(totals) else ()
+        return [f"{self.name}{_format_labels(names, labels)} {_format_value(value)}" for labels, value in sorted(totals.items())]
+
+
+# ===== AGREGASI MULTI-WORKER =====
+# Dengan direktori bersama (METRICS_DIR), setiap worker menulis total metriknya ke
+# metrics-<pid>.json; /metrics di worker mana pun menjumlahkan semua file sehingga counter
+# tetap monoton walau scrape jatuh ke worker berbeda. File worker yang sudah mati tetap
+# dihitung (counter tidak boleh turun); gauge-nya saja yang dibuang.
+
+def _snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"metrics-{pid}.json")
+
+
+def write_snapshot(directory: str):
+    """Tulis total metrik proses ini ke directory (atomik via rename)"""
+    data = {metric.name: [[list(labels), value] for labels, value in metric.totals().items()] for metric in REGISTRY}
+    path = _snapshot_path(directory, os.getpid())
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _merged_totals(directory: str) -> Dict[str, dict]:
+    write_snapshot(directory)
+    merged: Dict[str, dict] = {metric.name: {} for metric in REGISTRY}
+    by_name = {metric.name: metric for metric in REGISTRY}
+    for filename in os.listdir(directory):
+        if not (filename.startswith("metrics-") and filename.endswith(".json")):
+            continue
+        pid = int(filename[len("metrics-"):-len(".json")])
+        try:
+            with open(os.path.join(directory, filename), 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        alive = _pid_alive(pid)
+        for name, entries in data.items():
+            metric = by_name.get(name)
+            if metric is None:
+                continue
+            if isinstance(metric, Gauge):
+                if alive:
+                    metric.merge(merged[name], {(str(pid),): value for _, value in entries})
+            else:
+                metric.merge(merged[name], {tuple(labels): value for labels, value in entries})
+    return merged
+
+
+def render_metrics(directory: Optional[str] = None) -> str:
+    """Semua metrik terdaftar dalam format teks Prometheus (text/plain; version=0.0.4).
+
+    directory: direktori snapshot bersama semua worker (METRICS_DIR); None = hanya proses ini.
+    """
+    merged = _merged_totals(directory) if directory else {}
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render(merged.get(metric.name)))
+    return "\n".join(lines) + "\n"
+
+
+# ===== METRIK APLIKASI =====
+REQUESTS = Counter("kianoland_requests_total", "Request deteksi intent per channel", ["channel"])
+RULE_HITS = Counter("kianoland_rule_hits_total", "Jumlah respons per ATURAN yang terpicu", ["rule"])
+REQUEST_LATENCY = Histogram("kianoland_detection_seconds", "Durasi deteksi intent per request (termasuk cache dan antrean executor)", ["channel"])
+STAGE_LATENCY = Histogram("kianoland_detection_stage_seconds", "Durasi tiap tahap di dalam detect_intent_local (hanya deteksi baru, bukan cache)", ["stage"])
+SEND_LATENCY = Histogram("kianoland_send_seconds", "Durasi pengiriman pesan keluar per platform", ["platform"])
+SEND_RETRIES = Counter("kianoland_send_retries_total", "Pengiriman pesan yang diulang (429 / error jaringan)", ["platform"])
+
+
+def observe_stages(stages: Sequence[str], timings: Sequence[float]):
+    """Catat durasi per tahap; tahap yang tidak dijalankan (durasi 0, mis. similarity) dilewati"""
+    for stage, seconds in zip(stages, timings):
+        if seconds:
+            STAGE_LATENCY.observe(seconds, stage)
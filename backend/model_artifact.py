@@ -0,0 +1,116 @@
+import hashlib
+import hmac
+import json
+import logging
+import mmap
+import os
+import pickle
+import struct
+import time
+from typing import Any, Iterable, List, Optional
+
+logger = logging.getLogger("kianoland.nlp")
+
+# Naikkan ARTIFACT_FORMAT setiap kali struktur NLPModel berubah
+ARTIFACT_MAGIC = b"KIANONLP"
+ARTIFACT_FORMAT = 6
+_HEADER = struct.Struct("<8sHI")  # magic, format, panjang header JSON
+# Offset payload & buffer out-of-band di file (cukup untuk alignment dtype apa pun)
+BUFFER_ALIGNMENT = 64
+
+
+def source_hash(folder: str, extra_files: Iterable[str] = ()) -> str:
+    """SHA-256 isi semua file JSON di folder data + file kode yang ikut menentukan hasil kompilasi.
+
+    Berbasis isi (bukan mtime) sehingga tetap valid setelah git clone / COPY di Docker.
+    """
+    digest = hashlib.sha256(str(ARTIFACT_FORMAT).encode())
+    paths = []
+    for root, _, files in os.walk(folder):
+        paths.extend(os.path.join(root, name) for name in files if name.endswith('.json'))
+    for path in sorted(paths) + list(extra_files):
+        digest.update(os.path.relpath(path, folder).encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _aligned(offset: int) -> int:
+    return (offset + BUFFER_ALIGNMENT - 1) // BUFFER_ALIGNMENT * BUFFER_ALIGNMENT
+
+
+def write_artifact(path: str, payload: Any, source: str):
+    """Tulis artifact: header biner + header JSON (metadata) + payload pickle + buffer mentah.
+
+    Buffer besar (array NumPy, mis. matriks klasifier n-gram) dipisah dari pickle lewat
+    protocol 5 (out-of-band) dan ditulis apa adanya dengan offset sejajar BUFFER_ALIGNMENT,
+    sehingga read_artifact bisa membungkusnya langsung di atas mmap tanpa menyalin.
+    Ditulis atomik via rename.
+    """
+    buffers: List[pickle.PickleBuffer] = []
+    body = pickle.dumps(payload, protocol=5, buffer_callback=buffers.append)
+    raw = [buffer.raw() for buffer in buffers]
+    digest = hashlib.sha256(body)
+    for view in raw:
+        digest.update(view)
+    layout, offset = [], len(body)
+    for view in raw:
+        offset = _aligned(offset)
+        layout.append([offset, view.nbytes])
+        offset += view.nbytes
+    meta = json.dumps({
+        "source_hash": source, "payload_sha256": digest.hexdigest(), "created_at": time.time(),
+        "pickle_length": len(body), "buffers": layout,
+    }).encode()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        header = _HEADER.pack(ARTIFACT_MAGIC, ARTIFACT_FORMAT, len(meta)) + meta
+        # Payload dimulai di offset yang sejajar agar offset buffer relatif = offset absolut sejajar
+        f.write(header + b"\0" * (_aligned(len(header)) - len(header)))
+        f.write(body)
+        for (buffer_offset, _), view in zip(layout, raw):
+            f.write(b"\0" * (buffer_offset - (f.tell() - _aligned(len(header)))))
+            f.write(view)
+    os.replace(tmp_path, path)
+
+
+def read_artifact(path: str, expected_source: str, trusted_dir: str) -> Optional[Any]:
+    """Baca artifact. None jika file tidak ada, di luar trusted_dir, formatnya lain, basi, atau rusak.
+
+    Payload adalah pickle, jadi artifact hanya boleh berasal dari build sendiri: file harus
+    berada di trusted_dir (direktori build) dan digest payload harus cocok dengan header.
+    Buffer out-of-band tetap di-mmap (read-only, dibagi lewat page cache antar proses);
+    pickle sisanya (dict/list kecil) dibangun di heap seperti biasa.
+    """
+    real_path, real_dir = os.path.realpath(path), os.path.realpath(trusted_dir)
+    if os.path.commonpath([real_path, real_dir]) != real_dir:
+        logger.warning("Model artifact %s berada di luar %s, diabaikan", path, trusted_dir)
+        return None
+    if not os.path.exists(real_path):
+        logger.info("Model artifact %s tidak ada, memuat dari JSON", path)
+        return None
+    with open(real_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < _HEADER.size:
+            logger.warning("Model artifact %s rusak, memuat dari JSON", path)
+            return None
+        # Mapping tetap terbuka selama array yang dibangun di atasnya masih dipakai model
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, artifact_format, meta_length = _HEADER.unpack_from(mapped)
+    if magic != ARTIFACT_MAGIC or artifact_format != ARTIFACT_FORMAT:
+        logger.warning("Model artifact %s berformat lain (%s), memuat dari JSON", path, artifact_format)
+        return None
+    meta = json.loads(mapped[_HEADER.size:_HEADER.size + meta_length])
+    if meta.get("source_hash") != expected_source:
+        logger.warning("Model artifact %s basi (sumber berubah), memuat dari JSON", path)
+        return None
+    view = memoryview(mapped)[_aligned(_HEADER.size + meta_length):]
+    body = view[:meta["pickle_length"]]
+    buffers = [view[offset:offset + length] for offset, length in meta["buffers"]]
+    digest = hashlib.sha256(body)
+    for buffer in buffers:
+        digest.update(buffer)
+    if not hmac.compare_digest(digest.hexdigest(), meta.get("payload_sha256", "")):
+        logger.warning("Model artifact %s rusak (digest payload tidak cocok), memuat dari JSON", path)
+        return None
+    return pickle.loads(body, buffers=buffers)
@@ -0,0 +1,150 @@
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+try:
+    import numpy as np  # opsional: tanpa numpy engine n-gram tidak tersedia (NLP_ENGINE=rules)
+except ImportError:
+    np = None
+
+NGRAM_SIZES = (2, 3, 4)  # ukuran n-gram (semua >= 2)
+# Jumlah bucket hashing; tabrakan antar n-gram sesekali tidak masalah untuk klasifikasi
+NGRAM_DIM = 2 ** 11
+# Kandidat temperature softmax yang dicoba saat kalibrasi (0.01 .. ~2.6)
+TEMPERATURES = tuple(0.01 * 1.25 ** i for i in range(26))
+if np is not None:
+    # Konstanta hash n-gram (perkalian uint64 sengaja overflow/modulo 2^64)
+    _HASH_PRIME = np.uint64(1099511628211)
+    _HASH_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+class IntentPrediction(NamedTuple):
+    """Hasil klasifikasi satu utterance"""
+    intent: str
+    confidence: float  # probabilitas terkalibrasi (softmax dengan temperature hasil kalibrasi)
+    score: float       # cosine ke frasa pelatihan terdekat dari intent tersebut
+
+
+class NgramClassifier:
+    """Klasifikasi intent dengan n-gram karakter ter-hash dan operasi matriks NumPy.
+
+    Setiap frasa pelatihan menjadi vektor TF-IDF (tf sublinear, dinormalisasi L2). Skor sebuah
+    intent adalah cosine ke frasa terdekat milik intent itu, dihitung untuk seluruh batch dengan
+    satu perkalian matriks (batch x dim) @ (dim x frasa) lalu maksimum per intent (reduceat).
+    Skor diubah menjadi confidence dengan softmax ber-temperature; temperature dipilih saat
+    training dengan meminimalkan negative log-likelihood leave-one-out pada frasa pelatihan.
+    """
+
+    def __init__(self, intent_names: Tuple[str, ...], starts, bucket_weights, idf, temperature: float):
+        self.intent_names = intent_names
+        self.starts = starts                  # indeks frasa pertama tiap intent (frasa urut per intent)
+        self.bucket_weights = bucket_weights  # (dim x frasa), float32: kolom = vektor frasa ternormalisasi
+        self.idf = idf                        # (dim,), float32
+        self.temperature = temperature
+
+    @classmethod
+    def train(cls, examples: Iterable[Tuple[str, str]]) -> 'NgramClassifier':
+        """examples: (frasa, nama intent); intent tanpa frasa tidak ikut diklasifikasi"""
+        by_intent: Dict[str, List[str]] = {}
+        for phrase, intent in examples:
+            if phrase:
+                by_intent.setdefault(intent, []).append(phrase)
+        intent_names = tuple(by_intent)
+        phrases = [phrase for intent in intent_names for phrase in by_intent[intent]]
+        labels = np.repeat(np.arange(len(intent_names)), [len(by_intent[intent]) for intent in intent_names])
+        starts = np.concatenate(([0], np.cumsum([len(by_intent[intent]) for intent in intent_names])[:-1]))
+
+        rows, columns, counts = _sparse_counts(phrases)
+        document_frequency = np.bincount(columns, minlength=NGRAM_DIM)
+        idf = (np.log((1 + len(phrases)) / (1 + document_frequency)) + 1).astype(np.float32)
+        phrase_vectors = np.zeros((len(phrases), NGRAM_DIM), dtype=np.float32)
+        phrase_vectors[rows, columns] = _weights(rows, columns, counts, idf, len(phrases))
+
+        # Kalibrasi: skor leave-one-out (frasa tidak boleh cocok dengan dirinya sendiri)
+        similarities = phrase_vectors @ phrase_vectors.T
+        np.fill_diagonal(similarities, -1.0)
+        logits = np.maximum.reduceat(similarities, starts, axis=1)
+        best_temperature, best_loss = TEMPERATURES[0], float('inf')
+        for temperature in TEMPERATURES:
+            probabilities = _softmax(logits / temperature)
+            loss = -np.mean(np.log(probabilities[np.arange(len(phrases)), labels] + 1e-12))
+            if loss < best_loss:
+                best_temperature, best_loss = temperature, loss
+        return cls(intent_names, starts, np.ascontiguousarray(phrase_vectors.T), idf, float(best_temperature))
+
+    def __len__(self) -> int:
+        return self.bucket_weights.shape[1]
+
+    def scores(self, texts: Sequence[str]):
+        """Matriks (len(texts) x intent): cosine ke frasa terdekat tiap intent.
+
+        Perkalian matriks hanya memakai bucket yang muncul di batch ini, sehingga pesan tunggal
+        tidak perlu membaca seluruh bucket_weights dari memori.
+        """
+        rows, columns, counts = _sparse_counts(texts)
+        used, positions = np.unique(columns, return_inverse=True)
+        queries = np.zeros((len(texts), len(used)), dtype=np.float32)
+        queries[rows, positions] = _weights(rows, columns, counts, self.idf, len(texts))
+        return np.maximum.reduceat(queries @ self.bucket_weights[used], self.starts, axis=1)
+
+    def classify_batch(self, texts: Sequence[str], exclude: Iterable[str] = ()) -> List[IntentPrediction]:
+        """Klasifikasi semua teks sekaligus; intent di exclude tidak pernah dipilih.
+
+        Confidence tetap dihitung terhadap semua intent (tidak dinormalisasi ulang setelah
+        exclude), jadi teks yang sebenarnya mirip intent yang dikecualikan mendapat confidence rendah.
+        """
+        if not texts:
+            return []
+        scores = self.scores(texts)
+        probabilities = _softmax(scores / self.temperature)
+        excluded = [index for index, name in enumerate(self.intent_names) if name in set(exclude)]
+        candidates = probabilities.copy()
+        candidates[:, excluded] = -1.0
+        best = np.argmax(candidates, axis=1)
+        rows = np.arange(len(texts))
+        return [
+            IntentPrediction(self.intent_names[index], float(confidence), float(score))
+            for index, confidence, score in zip(best.tolist(), probabilities[rows, best].tolist(), scores[rows, best].tolist())
+        ]
+
+    def classify(self, text: str, exclude: Iterable[str] = ()) -> IntentPrediction:
+        return self.classify_batch([text], exclude)[0]
+
+
+def _sparse_counts(texts: Sequence[str]):
+    """Jumlah n-gram karakter per (teks, bucket) untuk seluruh batch sekaligus: (rows, columns, counts), urut per teks.
+
+    Semua teks (dipad spasi) digabung menjadi satu array code point, lalu hash polinomial
+    setiap n-gram dihitung dengan operasi vektor; n-gram yang melewati batas dua teks dibuang.
+    Hash hanya bergantung pada isi teks (bukan hash() bawaan yang berbeda antar proses), jadi
+    bucket selalu sama dengan saat model (artifact) dibangun.
+    """
+    padded = [f" {text} " for text in texts]
+    lengths = np.fromiter((len(text) for text in padded), dtype=np.int64, count=len(padded))
+    codes = np.frombuffer("".join(padded).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    owners = np.repeat(np.arange(len(padded)), lengths)
+    hashes, starts, ends = [], [], []
+    rolling = codes
+    for n in range(2, max(NGRAM_SIZES) + 1):
+        # hash n-gram = hash (n-1)-gram * prima + karakter berikutnya
+        rolling = rolling[:-1] * _HASH_PRIME + codes[n - 1:]
+        if n in NGRAM_SIZES:
+            hashes.append(rolling)
+            starts.append(owners[:len(rolling)])
+            ends.append(owners[n - 1:])
+    hashes, starts = np.concatenate(hashes), np.concatenate(starts)
+    inside = starts == np.concatenate(ends)
+    buckets = ((hashes[inside] * _HASH_MIX) >> np.uint64(40)).astype(np.int64) % NGRAM_DIM
+    unique, counts = np.unique(starts[inside] * NGRAM_DIM + buckets, return_counts=True)
+    return unique // NGRAM_DIM, unique % NGRAM_DIM, counts
+
+
+def _weights(rows, columns, counts, idf, size: int):
+    """tf sublinear x idf, lalu normalisasi L2 per teks"""
+    weights = (np.log1p(counts) * idf[columns]).astype(np.float32)
+    norms = np.sqrt(np.bincount(rows, weights * weights, minlength=size)).astype(np.float32)
+    norms[norms == 0] = 1.0
+    return weights / norms[rows]
+
+
+def _softmax(logits):
+    shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
@@ -0,0 +1,174 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from . import local_nlp
+from .metrics import observe_stages
+
+EXECUTOR_MODES = ('inline', 'thread', 'process')
+
+
+class ExecutorSaturated(RuntimeError):
+    """Jumlah deteksi yang sedang antre/berjalan sudah mencapai batas max_pending"""
+
+
+def _init_process_worker(model: 'local_nlp.NLPModel'):
+    """Initializer worker process: pakai snapshot model yang sama persis dengan proses utama"""
+    local_nlp.swap_model(model)
+
+
+class DetectionExecutor:
+    """Menjalankan classify_intent di luar event loop.
+
+    Mode:
+    - inline: langsung di event loop (perilaku lama, cocok untuk development)
+    - thread: ThreadPoolExecutor
+    - process: ProcessPoolExecutor, tiap worker menerima salinan snapshot model saat start;
+      setelah reload, refresh() mengganti pool agar worker memakai model baru
+
+    Cache respons dicek dulu di event loop, jadi hanya cache miss yang dikirim ke pool.
+    Jumlah request yang menunggu pool dibatasi max_pending; bila penuh, ExecutorSaturated
+    dinaikkan agar pemanggil bisa menolak request (backpressure) alih-alih menumpuk antrean.
+    """
+
+    def __init__(self, mode: str = 'inline', workers: int = 4, max_pending: int = 64):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"NLP executor mode harus salah satu dari {EXECUTOR_MODES}, bukan '{mode}'")
+        self.mode = mode
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._pool: Optional[Executor] = None
+
+    @classmethod
+    def from_env(cls) -> 'DetectionExecutor':
+        return cls(
+            mode=os.getenv("NLP_EXECUTOR", "thread").lower(),
+            workers=int(os.getenv("NLP_WORKERS", str(min(4, os.cpu_count() or 1)))),
+            max_pending=int(os.getenv("NLP_MAX_PENDING", "64")),
+        )
+
+    def start(self):
+        if self.mode == 'thread':
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="nlp")
+        elif self.mode == 'process':
+            self._pool = self._create_process_pool(local_nlp.MODEL)
+
+    def _create_process_pool(self, model: 'local_nlp.NLPModel') -> ProcessPoolExecutor:
+        # Proses "spawn" mengimpor ulang local_nlp; env diwariskan sehingga anak tidak memuat
+        # model sendiri saat impor dan langsung memakai snapshot dari initializer. Proses ini
+        # sudah memuat local_nlp, jadi flag tidak berpengaruh di sini.
+        os.environ[local_nlp.LOAD_ON_IMPORT_ENV] = "false"
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(os.getenv("NLP_PROCESS_START_METHOD", "spawn")),
+            initializer=_init_process_worker,
+            initargs=(model,),
+        )
+
+    def refresh(self, model: 'local_nlp.NLPModel'):
+        """Pakai model baru setelah reload.
+
+        Mode inline/thread berbagi local_nlp.MODEL sehingga tidak perlu apa-apa. Mode process
+        mendapat pool baru; pool lama ditutup tanpa membatalkan pekerjaan yang sudah diantrekan,
+        jadi request yang sedang berjalan tetap selesai (dengan model lama).
+        """
+        if self.mode != 'process' or self._pool is None:
+            return
+        old_pool, self._pool = self._pool, self._create_process_pool(model)
+        old_pool.shutdown(wait=False, cancel_futures=False)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    @property
+    def saturated(self) -> bool:
+        return self._pool is not None and self.pending >= self.max_pending
+
+    async def detect(self, text: str, context: 'local_nlp.ConversationContext' = None) -> local_nlp.Detection:
+        """Deteksi satu pesan; context = konteks percakapan sesi pengirim (boleh None)"""
+        detection = local_nlp.RESPONSE_CACHE.get(local_nlp.cache_key(text, context=context))
+        if detection is not None:
+            return detection
+
+        if self._pool is None:
+            detection = local_nlp.classify_intent(text, None, context)
+        else:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise ExecutorSaturated(f"{self.pending} deteksi sedang berjalan (batas {self.max_pending})")
+            self.pending += 1
+            try:
+                loop = asyncio.get_running_loop()
+                detection = await loop.run_in_executor(self._pool, local_nlp.classify_intent, text, None, context)
+            finally:
+                self.pending -= 1
+        self.completed += 1
+        observe_stages(local_nlp.DETECTION_STAGES, detection.timings)
+        local_nlp.RESPONSE_CACHE.put(local_nlp.cache_key(text, detection.version, context), detection)
+        return detection
+
+    async def detect_batch(self, texts: List[str], chunk_size: int = 256) -> List[local_nlp.Detection]:
+        """Deteksi banyak utterance sekaligus, hasil sesuai urutan input.
+
+        Cache dicek per utterance, duplikat hanya dideteksi sekali, dan sisa cache miss
+        dikirim ke pool per potongan (chunk_size) sehingga mode process cukup satu
+        round-trip antar-proses per potongan, bukan per utterance.
+        """
+        keys = [local_nlp.cache_key(text) for text in texts]
+        detections: Dict[str, local_nlp.Detection] = {}
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key in detections or key in missing:
+                continue
+            cached = local_nlp.RESPONSE_CACHE.get(key)
+            if cached is not None:
+                detections[key] = cached
+            else:
+                missing[key] = text
+
+        items = list(missing.items())
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        if chunks and self._pool is not None and self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ExecutorSaturated(f"{self.pending} deteksi sedang berjalan (batas {self.max_pending})")
+
+        # Maksimal satu potongan per worker yang berjalan bersamaan
+        limit = asyncio.Semaphore(max(self.workers, 1))
+
+        async def run_chunk(chunk):
+            chunk_texts = [text for _, text in chunk]
+            if self._pool is None:
+                return chunk, local_nlp.classify_intents_batch(chunk_texts)
+            async with limit:
+                self.pending += 1
+                try:
+                    loop = asyncio.get_running_loop()
+                    return chunk, await loop.run_in_executor(self._pool, local_nlp.classify_intents_batch, chunk_texts)
+                finally:
+                    self.pending -= 1
+
+        for chunk, chunk_detections in await asyncio.gather(*(run_chunk(chunk) for chunk in chunks)):
+            for (key, _), detection in zip(chunk, chunk_detections):
+                detections[key] = detection
+                observe_stages(local_nlp.DETECTION_STAGES, detection.timings)
+                local_nlp.RESPONSE_CACHE.put((detection.version,) + key[1:], detection)
+                self.completed += 1
+        return [detections[key] for key in keys]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "workers": self.workers if self._pool is not None else 0,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "saturated": self.saturated,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
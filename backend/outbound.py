@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+
+import httpx
+
+from .metrics import SEND_RETRIES
+
+logger = logging.getLogger("kianoland.outbound")
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+DISCORD_MESSAGE_LIMIT = 2000
+
+
+def pack_fragments(fragments: List[str], limit: int, separator: str = "\n\n") -> List[str]:
+    """Gabungkan fragmen respons (dipisah '|||') menjadi sesedikit mungkin pesan dengan panjang <= limit.
+
+    Urutan fragmen dipertahankan; fragmen yang sendirinya melebihi limit dipotong di baris baru terakhir.
+    """
+    pieces = []
+    for fragment in fragments:
+        fragment = fragment.strip()
+        while len(fragment) > limit:
+            cut = fragment.rfind("\n", 0, limit)
+            if cut <= 0:
+                cut = limit
+            pieces.append(fragment[:cut].strip())
+            fragment = fragment[cut:].strip()
+        if fragment:
+            pieces.append(fragment)
+
+    messages: List[str] = []
+    for piece in pieces:
+        if messages and len(messages[-1]) + len(separator) + len(piece) <= limit:
+            messages[-1] += separator + piece
+        else:
+            messages.append(piece)
+    return messages
+
+
+class TokenBucket:
+    """Token bucket async: rate token per detik, maksimal capacity token (burst). rate <= 0 berarti tanpa batas."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def pause(self, seconds: float):
+        """Tahan bucket selama seconds (mis. retry_after dari respons 429)"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            wait = self.blocked_until - now
+            if self.rate <= 0:
+                if wait <= 0:
+                    return
+            else:
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if wait <= 0 and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(wait, (1 - self.tokens) / self.rate)
+            await asyncio.sleep(wait)
+
+
+class OutboundScheduler:
+    """Penjadwal pesan keluar ke Telegram.
+
+    Setiap pengiriman mengambil token dari bucket per chat lalu dari bucket global, sehingga
+    lonjakan balasan tidak melewati batas Bot API (kurang lebih 1 pesan/detik per chat dan
+    30 pesan/detik total). Hanya respons 2xx dihitung terkirim. Respons 429 menahan bucket chat
+    tersebut dan bucket global selama retry_after lalu pesan dicoba lagi; 5xx dan error jaringan
+    dicoba lagi dengan backoff eksponensial; 4xx lain dicatat dan pesan dibuang (dropped).
+    Bucket per chat disimpan LRU (max_chats) agar memori tetap terbatas.
+    """
+
+    def __init__(self, post: Callable[[int, str], Awaitable[httpx.Response]], global_rate: float = 30.0,
+                 chat_rate: float = 1.0, chat_burst: float = 3.0, max_retries: int = 3,
+                 coalesce: bool = False, max_chats: int = 10000):
+        self.post = post
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.coalesce = coalesce
+        self.max_chats = max_chats
+        self._chat_buckets: 'OrderedDict[int, TokenBucket]' = OrderedDict()
+        self.sent = 0
+        self.dropped = 0
+
+    @classmethod
+    def from_env(cls, post: Callable[[int, str], Awaitable[httpx.Response]], pace_chats: bool = True) -> 'OutboundScheduler':
+        """pace_chats=False: tanpa bucket per chat (mis. webhook inline, di mana menunggu token
+        berarti menahan request webhook); batas per chat lalu hanya dijaga lewat retry 429"""
+        return cls(
+            post,
+            global_rate=float(os.getenv("TELEGRAM_GLOBAL_RATE", "30")),
+            chat_rate=float(os.getenv("TELEGRAM_CHAT_RATE", "1")) if pace_chats else 0.0,
+            chat_burst=float(os.getenv("TELEGRAM_CHAT_BURST", "3")),
+            max_retries=int(os.getenv("TELEGRAM_MAX_RETRIES", "3")),
+            coalesce=os.getenv("TELEGRAM_COALESCE", "true").lower() in ("1", "true", "yes"),
+        )
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+            if len(self._chat_buckets) > self.max_chats:
+                self._chat_buckets.popitem(last=False)
+        else:
+            self._chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    async def send(self, chat_id: int, text: str) -> Optional[httpx.Response]:
+        """Kirim satu pesan dengan rate limit & retry. None jika pesan akhirnya gagal dikirim."""
+        bucket = self._chat_bucket(chat_id)
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            await self.global_bucket.acquire()
+            delay = 0.0
+            try:
+                response = await self.post(chat_id, text)
+            except httpx.TransportError as e:
+                reason = f"{type(e).__name__}: {e}"
+                delay = min(2.0 ** attempt, 30.0)
+            else:
+                status = response.status_code
+                if 200 <= status < 300:
+                    self.sent += 1
+                    return response
+                if status == 429:
+                    # Flood limit Telegram bisa berlaku untuk seluruh bot, bukan hanya chat ini
+                    retry_after = _retry_after(response)
+                    reason = f"429 retry_after={retry_after}"
+                    bucket.pause(retry_after)
+                    self.global_bucket.pause(retry_after)
+                elif status >= 500:
+                    reason = f"HTTP {status}"
+                    delay = min(2.0 ** attempt, 30.0)
+                else:
+                    # 4xx lain (chat tidak ada, bot diblokir, HTML tidak valid): mengulang tidak menolong
+                    self.dropped += 1
+                    logger.error("telegram send rejected", extra={"fields": {
+                        "chat_id": chat_id, "status": status, "reason": response.text[:200],
+                    }})
+                    return None
+
+            if attempt == self.max_retries:
+                break
+            SEND_RETRIES.inc("telegram")
+            logger.warning("telegram send retry", extra={"fields": {
+                "chat_id": chat_id, "attempt": attempt + 1, "reason": reason,
+            }})
+            await asyncio.sleep(delay)
+
+        self.dropped += 1
+        logger.error("telegram send failed", extra={"fields": {"chat_id": chat_id, "reason": reason}})
+        return None
+
+    async def send_fragments(self, chat_id: int, fragments: List[str]):
+        """Kirim fragmen respons berurutan; dengan coalesce digabung hingga batas 4096 karakter"""
+        if self.coalesce:
+            messages = pack_fragments(fragments, TELEGRAM_MESSAGE_LIMIT)
+        else:
+            messages = [fragment.strip() for fragment in fragments if fragment.strip()]
+        for message in messages:
+            await self.send(chat_id, message)
+
+    def stats(self):
+        return {
+            "chats": len(self._chat_buckets),
+            "coalesce": self.coalesce,
+            "sent": self.sent,
+            "dropped": self.dropped,
+        }
+
+
+def _retry_after(response: httpx.Response) -> float:
+    try:
+        return float(response.json()["parameters"]["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        pass
+    try:
+        return float(response.headers.get("Retry-After", 1))
+    except ValueError:
+        return 1.0
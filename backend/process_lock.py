@@ -0,0 +1,94 @@
+import os
+import tempfile
+import time
+from typing import Optional
+
+try:
+    import fcntl  # tidak ada di Windows: di sana setiap proses dianggap pemilik (mode satu proses)
+except ImportError:
+    fcntl = None
+
+
+class ProcessLock:
+    """Kunci file lokal (flock) untuk memilih satu proses pemilik di antara worker satu mesin.
+
+    Pemilik adalah proses pertama yang berhasil mengunci file; kunci dilepas kernel saat
+    proses itu mati, sehingga worker lain (atau pengganti dari gunicorn) bisa mengambil alih
+    lewat acquire() berikutnya. acquire() tidak pernah memblokir.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> 'ProcessLock':
+        return cls(os.getenv("BOT_LOCK_FILE", os.path.join(tempfile.gettempdir(), "kianoland-bot.lock")))
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        if fcntl is None:
+            self._fd = -1
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        # PID pemilik ditulis hanya sebagai informasi (mis. untuk debugging di server)
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        if self._fd >= 0:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        self._fd = None
+
+
+class ReloadMarker:
+    """File penanda generasi reload yang dibagi semua worker satu mesin.
+
+    Worker yang menjalankan reload menulis generasi baru lewat publish(); worker lain
+    membandingkan read() dengan generasi terakhir yang sudah mereka terapkan dan ikut reload
+    bila berbeda. Ditulis atomik (rename) sehingga pembaca tidak pernah melihat isi setengah jadi.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @classmethod
+    def from_env(cls) -> 'ReloadMarker':
+        return cls(os.getenv("MODEL_RELOAD_MARKER", os.path.join(tempfile.gettempdir(), "kianoland-reload.marker")))
+
+    def read(self) -> Optional[str]:
+        try:
+            with open(self.path, 'r') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def published_at(self) -> float:
+        """Waktu publish terakhir (epoch detik), 0 bila belum pernah"""
+        try:
+            return os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return 0.0
+
+    def publish(self) -> str:
+        generation = f"{os.getpid()}:{time.time_ns()}"
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(generation)
+        os.replace(tmp_path, self.path)
+        return generation
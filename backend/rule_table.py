@@ -0,0 +1,172 @@
+import json
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Kunci kondisi yang dikenal di blok "when" sebuah aturan (lihat dialogflow_kianoland/rules.json)
+CONDITION_KEYS = (
+    'input_equals', 'any_keywords', 'all_keywords', 'none_keywords', 'requires', 'forbids',
+    'entity_equals', 'project_in', 'project_valid', 'any', 'unless',
+)
+TEMPLATE_ARGS = ('project', 'lokasi', 'primary', 'intro')
+
+
+class Condition(NamedTuple):
+    """Kondisi aturan yang sudah dikompilasi; semua bagian yang diisi harus terpenuhi"""
+    input_equals: Optional[str] = None
+    any_keywords: frozenset = frozenset()
+    all_keywords: frozenset = frozenset()
+    none_keywords: frozenset = frozenset()
+    requires: tuple = ()
+    forbids: tuple = ()
+    entity_equals: tuple = ()
+    project_in: frozenset = frozenset()
+    project_valid: Optional[bool] = None
+    any: tuple = ()
+    unless: tuple = ()
+
+
+class Rule(NamedTuple):
+    """Satu baris tabel aturan: kondisi + aksi (respons intent, template, teks statis atau kemiripan)"""
+    id: str
+    description: str
+    condition: Condition
+    intent: Optional[str] = None
+    template: Optional[tuple] = None  # ((argumen render_template, nilai atau "$entitas"), ...)
+    static: Optional[str] = None
+    similarity: bool = False
+
+
+class RuleSet(NamedTuple):
+    """Aturan terurut + indeks grup kata kunci -> aturan yang mungkin cocok.
+
+    Aturan dengan any_keywords/all_keywords hanya bisa cocok bila salah satu grupnya muncul,
+    jadi saat evaluasi cukup aturan dari grup yang terdeteksi ditambah aturan tanpa kata
+    kunci (always) yang diperiksa. Biaya evaluasi mengikuti jumlah grup yang cocok, bukan
+    jumlah aturan di tabel.
+    """
+    rules: Tuple[Rule, ...]
+    by_group: Dict[str, Tuple[int, ...]]
+    always: Tuple[int, ...]
+
+
+def load_rule_table(path: str) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _compile_condition(spec: dict, groups: Iterable[str], where: str) -> Condition:
+    unknown = set(spec) - set(CONDITION_KEYS)
+    if unknown:
+        raise ValueError(f"{where}: kondisi tidak dikenal {sorted(unknown)}")
+    for key in ('any_keywords', 'all_keywords', 'none_keywords'):
+        missing = set(spec.get(key, ())) - set(groups)
+        if missing:
+            raise ValueError(f"{where}: grup kata kunci tidak ada {sorted(missing)}")
+    return Condition(
+        input_equals=spec.get('input_equals'),
+        any_keywords=frozenset(spec.get('any_keywords', ())),
+        all_keywords=frozenset(spec.get('all_keywords', ())),
+        none_keywords=frozenset(spec.get('none_keywords', ())),
+        requires=tuple(spec.get('requires', ())),
+        forbids=tuple(spec.get('forbids', ())),
+        entity_equals=tuple(spec.get('entity_equals', {}).items()),
+        project_in=frozenset(spec.get('project_in', ())),
+        project_valid=spec.get('project_valid'),
+        any=tuple(_compile_condition(sub, groups, where) for sub in spec.get('any', ())),
+        unless=tuple(_compile_condition(sub, groups, where) for sub in spec.get('unless', ())),
+    )
+
+
+def compile_rules(table: dict, intent_names: Iterable[str]) -> RuleSet:
+    """Validasi tabel aturan terhadap grup kata kunci & intent yang ada lalu bangun RuleSet.
+
+    Tabel yang salah (grup/intent tidak dikenal, aksi ganda) menaikkan ValueError sehingga
+    reload gagal dan model lama tetap dipakai.
+    """
+    groups = table.get('keyword_groups', {})
+    intent_names = set(intent_names)
+    rules: List[Rule] = []
+    by_group: Dict[str, List[int]] = {}
+    always: List[int] = []
+    for position, spec in enumerate(table.get('rules', [])):
+        where = f"aturan #{spec.get('id', position)}"
+        intent = spec.get('intent')
+        if intent is not None and intent not in intent_names:
+            raise ValueError(f"{where}: intent '{intent}' tidak ada")
+        if sum(1 for key in ('template', 'static', 'similarity') if spec.get(key)) > 1:
+            raise ValueError(f"{where}: pilih salah satu dari template, static atau similarity")
+        template = spec.get('template')
+        if template is not None:
+            if intent is None:
+                raise ValueError(f"{where}: template butuh intent")
+            unknown = set(template) - set(TEMPLATE_ARGS)
+            if unknown:
+                raise ValueError(f"{where}: argumen template tidak dikenal {sorted(unknown)}")
+            template = tuple(template.items())
+        if intent is None and not (spec.get('static') or spec.get('similarity')):
+            raise ValueError(f"{where}: aturan tanpa aksi")
+
+        condition = _compile_condition(spec.get('when', {}), groups, where)
+        rule = Rule(str(spec.get('id', position)), spec.get('description', ''), condition,
+                    intent, template, spec.get('static'), bool(spec.get('similarity')))
+        index = len(rules)
+        rules.append(rule)
+        triggers = condition.any_keywords or condition.all_keywords
+        if triggers:
+            for group in triggers:
+                by_group.setdefault(group, []).append(index)
+        else:
+            always.append(index)
+    return RuleSet(tuple(rules), {group: tuple(indexes) for group, indexes in by_group.items()}, tuple(always))
+
+
+def candidate_rules(rule_set: RuleSet, hits: Dict[str, str]) -> List[Rule]:
+    """Aturan yang mungkin cocok untuk grup kata kunci yang terdeteksi, sesuai urutan prioritas"""
+    indexes = set(rule_set.always)
+    for group in hits:
+        indexes.update(rule_set.by_group.get(group, ()))
+    return [rule_set.rules[index] for index in sorted(indexes)]
+
+
+def condition_matches(condition: Condition, text: str, entities: Dict[str, str], hits: Dict[str, str],
+                      project_valid: bool) -> bool:
+    if condition.input_equals is not None and text != condition.input_equals:
+        return False
+    if condition.any_keywords and condition.any_keywords.isdisjoint(hits):
+        return False
+    if any(group not in hits for group in condition.all_keywords):
+        return False
+    if not condition.none_keywords.isdisjoint(hits):
+        return False
+    if any(not entities.get(entity) for entity in condition.requires):
+        return False
+    if any(entities.get(entity) for entity in condition.forbids):
+        return False
+    if any(entities.get(entity) != value for entity, value in condition.entity_equals):
+        return False
+    if condition.project_in and entities.get('proyek') not in condition.project_in:
+        return False
+    if condition.project_valid is not None and project_valid != condition.project_valid:
+        return False
+    if condition.any and not any(condition_matches(sub, text, entities, hits, project_valid) for sub in condition.any):
+        return False
+    if any(condition_matches(sub, text, entities, hits, project_valid) for sub in condition.unless):
+        return False
+    return True
+
+
+def resolve_args(template: tuple, entities: Dict[str, str]) -> Dict[str, Optional[str]]:
+    """Argumen render_template; nilai "$nama" diambil dari entitas yang terdeteksi"""
+    return {
+        name: entities.get(value[1:]) if isinstance(value, str) and value.startswith('$') else value
+        for name, value in template
+    }
+
+
+class _Entities(dict):
+    def __missing__(self, key):
+        return ''
+
+
+def format_static(text: str, entities: Dict[str, str]) -> str:
+    """Isi placeholder {entitas} pada teks statis aturan; entitas yang tidak ada menjadi kosong"""
+    return text.format_map(_Entities(entities))
@@ -0,0 +1,164 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import PlainTextResponse, Response
+
+try:
+    import brotli  # opsional: tanpa paket ini hanya gzip yang disiapkan
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger("kianoland.static")
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+# Di bawah ukuran ini kompresi tidak sebanding dengan overhead header
+MIN_COMPRESS_SIZE = 512
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+ENCODING_ETAG_SUFFIXES = {"gzip": "-gz", "br": "-br"}
+# Referensi aset lokal di index.html yang diberi versi (?v=<hash isi>)
+STATIC_REFERENCE_PATTERN = re.compile(r'(["\'])/static/([^"\'?#]+)\1')
+
+
+class StaticAsset(NamedTuple):
+    """Satu file frontend yang sudah dibaca & dikompresi di memori"""
+    content_type: str
+    body: bytes
+    gzip: Optional[bytes]
+    br: Optional[bytes]
+    version: str  # hash isi (12 karakter pertama sha256), dasar ETag
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        """ETag kuat per content-coding (RFC 9110 8.8.3): "<versi>", "<versi>-gz" atau "<versi>-br"."""
+        return f'"{self.version}{ENCODING_ETAG_SUFFIXES.get(encoding, "")}"'
+
+    @property
+    def etags(self) -> Tuple[str, ...]:
+        return tuple(self.etag(encoding) for encoding in (None, "gzip", "br"))
+
+
+def _build_asset(path: str, body: bytes) -> StaticAsset:
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    if content_type.startswith('text/') or content_type == 'application/javascript':
+        content_type += '; charset=utf-8'
+    gzip_body = br_body = None
+    if content_type.startswith(COMPRESSIBLE_TYPES) and len(body) >= MIN_COMPRESS_SIZE:
+        # mtime=0 agar hasil gzip deterministik (ETag sama di semua worker)
+        gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        if brotli is not None:
+            br_body = brotli.compress(body, quality=11)
+    return StaticAsset(content_type, body, gzip_body, br_body, hashlib.sha256(body).hexdigest()[:12])
+
+
+def build_static_assets(folder: str) -> Dict[str, StaticAsset]:
+    """Baca semua file di folder frontend, kompresi sekali (gzip/brotli) dan beri versi hash isi.
+
+    index.html ditulis ulang sehingga setiap /static/<file> menjadi /static/<file>?v=<hash>;
+    URL berversi boleh di-cache browser/CDN selamanya karena isi baru berarti URL baru.
+    """
+    raw: Dict[str, bytes] = {}
+    for root, _, files in os.walk(folder):
+        for filename in files:
+            path = os.path.join(root, filename)
+            with open(path, 'rb') as f:
+                raw[os.path.relpath(path, folder).replace(os.sep, '/')] = f.read()
+
+    assets = {name: _build_asset(name, body) for name, body in raw.items() if name != 'index.html'}
+    if 'index.html' in raw:
+        def versioned(match):
+            quote, name = match.group(1), match.group(2)
+            asset = assets.get(name)
+            return match.group(0) if asset is None else f"{quote}/static/{name}?v={asset.version}{quote}"
+        html = STATIC_REFERENCE_PATTERN.sub(versioned, raw['index.html'].decode('utf-8'))
+        assets['index.html'] = _build_asset('index.html', html.encode('utf-8'))
+
+    compressed = sum(1 for asset in assets.values() if asset.gzip)
+    logger.info("✅ Prepared %d static assets (%d compressed, brotli=%s)", len(assets), compressed, brotli is not None)
+    return assets
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """{coding: q} dari header Accept-Encoding ("br;q=0, gzip" -> {"br": 0.0, "gzip": 1.0})"""
+    accepted: Dict[str, float] = {}
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def _accepts(accepted: Dict[str, float], coding: str) -> bool:
+    return accepted.get(coding, accepted.get("*", 0.0)) > 0
+
+
+def asset_response(asset: StaticAsset, headers: Headers, immutable: bool = False, method: str = "GET") -> Response:
+    """Response dari memori: br/gzip/identity sesuai Accept-Encoding, 304 bila ETag salah satu varian cocok"""
+    accepted = accepted_encodings(headers.get("accept-encoding", ""))
+    encoding, body = None, asset.body
+    if asset.br is not None and _accepts(accepted, "br"):
+        encoding, body = "br", asset.br
+    elif asset.gzip is not None and _accepts(accepted, "gzip"):
+        encoding, body = "gzip", asset.gzip
+    response_headers = {
+        "ETag": asset.etag(encoding),
+        "Cache-Control": IMMUTABLE_CACHE if immutable else REVALIDATE_CACHE,
+        "Vary": "Accept-Encoding",
+    }
+    # Semua varian berasal dari isi yang sama, jadi ETag varian mana pun masih valid
+    if_none_match = [tag.strip().removeprefix("W/") for tag in headers.get("if-none-match", "").split(",")]
+    if "*" in if_none_match or any(tag in asset.etags for tag in if_none_match):
+        return Response(status_code=304, headers=response_headers)
+
+    if encoding is not None:
+        response_headers["Content-Encoding"] = encoding
+    response = Response(b"" if method == "HEAD" else body, media_type=asset.content_type, headers=response_headers)
+    response.headers["Content-Length"] = str(len(body))
+    return response
+
+
+class PrecompressedStaticFiles:
+    """Pengganti StaticFiles untuk mount /static: semua aset disajikan dari memori.
+
+    Tidak ada baca file, kompresi, atau hitung ETag per request. URL dengan ?v=<versi yang
+    cocok> mendapat Cache-Control immutable setahun; tanpa versi, browser wajib revalidasi
+    (ETag -> 304).
+    """
+
+    def __init__(self, assets: Dict[str, StaticAsset]):
+        self.assets = assets
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            raise RuntimeError("PrecompressedStaticFiles hanya untuk HTTP")
+        method = scope["method"]
+        # Di dalam Mount, root_path sudah berisi prefix mount ("/static")
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if path.startswith(root_path):
+            path = path[len(root_path):]
+        asset = self.assets.get(path.lstrip("/"))
+        if method not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405)
+        elif asset is None:
+            response = PlainTextResponse("Not Found", status_code=404)
+        else:
+            query = scope.get("query_string", b"").decode("latin-1")
+            immutable = f"v={asset.version}" in query.split("&")
+            response = asset_response(asset, Headers(scope=scope), immutable, method)
+        await response(scope, receive, send)
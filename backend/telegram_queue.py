@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List
+
+logger = logging.getLogger("kianoland.telegram")
+
+WEBHOOK_MODES = ('inline', 'queue')
+
+
+class QueueFull(RuntimeError):
+    """Antrean shard untuk chat ini tetap penuh sampai put_timeout habis"""
+
+
+class UpdateQueue:
+    """Antrean update Telegram yang diproses oleh sejumlah worker async.
+
+    Setiap worker punya antrean sendiri (shard) dan chat_id selalu dipetakan ke shard yang
+    sama, jadi pesan dari satu chat diproses berurutan sementara chat lain berjalan paralel.
+    Kapasitas total (max_size) dibagi rata ke semua shard. Bila shard penuh, submit menunggu
+    paling lama put_timeout lalu menaikkan QueueFull; webhook menjawab 503 sehingga Telegram
+    mengirim ulang update tersebut nanti (backpressure), bukan menumpuk di memori.
+    """
+
+    def __init__(self, handler: Callable[..., Awaitable[Any]], workers: int = 4,
+                 max_size: int = 1000, put_timeout: float = 1.0):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_size = max_size
+        self.put_timeout = put_timeout
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+
+    @classmethod
+    def from_env(cls, handler: Callable[..., Awaitable[Any]]) -> 'UpdateQueue':
+        return cls(
+            handler,
+            workers=int(os.getenv("TELEGRAM_WORKERS", "4")),
+            max_size=int(os.getenv("TELEGRAM_QUEUE_SIZE", "1000")),
+            put_timeout=float(os.getenv("TELEGRAM_QUEUE_PUT_TIMEOUT", "1")),
+        )
+
+    def start(self):
+        shard_size = max(1, self.max_size // self.workers)
+        self._queues = [asyncio.Queue(maxsize=shard_size) for _ in range(self.workers)]
+        self._tasks = [
+            asyncio.create_task(self._worker(queue), name=f"telegram-worker-{i}")
+            for i, queue in enumerate(self._queues)
+        ]
+
+    async def shutdown(self, timeout: float = 5.0):
+        """Selesaikan update yang sudah diterima (maksimal timeout detik), lalu hentikan worker"""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self._queues)), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Telegram queue shutdown: %d update tidak sempat diproses", self.depth)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    @property
+    def depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    async def submit(self, chat_id: int, *args: Any):
+        queue = self._queues[hash(chat_id) % len(self._queues)]
+        item = (chat_id,) + args
+        try:
+            queue.put_nowait(item)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(queue.put(item), self.put_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise QueueFull(f"antrean Telegram penuh ({queue.qsize()}/{queue.maxsize} di shard ini)")
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            item = await queue.get()
+            try:
+                await self.handler(*item)
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("Gagal memproses update Telegram untuk chat %s", item[0])
+            finally:
+                queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._tasks),
+            "depth": self.depth,
+            "max_size": self.max_size,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,77 @@
+import json
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+WORD_PATTERN = re.compile(r'\w+')
+# Tanda baca diganti spasi, kecuali . / - di antara dua karakter kata ("30/60", "1.5 lantai", "lihat-lihat")
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s./-]|(?<!\w)[./-]+|[./-]+(?!\w)')
+# Perintah bot di awal pesan ("!info", "/start") tetap utuh
+COMMAND_PATTERN = re.compile(r'[!/](?=\w)')
+# Huruf (bukan angka: "500000" tetap) yang diulang 3x atau lebih: "haloooo" -> "halo"
+REPEATED_LETTER_PATTERN = re.compile(r'([^\W\d_])\1{2,}')
+
+
+class NormalizedText(NamedTuple):
+    """Teks ternormalisasi beserta daftar katanya (dihitung sekali, dipakai semua tahap deteksi)"""
+    text: str
+    tokens: Tuple[str, ...]
+
+
+def load_slang(path: str) -> Dict[str, List[str]]:
+    """{bentuk baku: [singkatan/slang, ...]} dari file JSON; kosong jika file tidak ada"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class Normalizer:
+    """Satu tahap normalisasi untuk frasa pelatihan, kata kunci, sinonim entitas dan input pengguna.
+
+    Urutan: lowercase, tanda baca -> spasi, huruf berulang diringkas, spasi dirapikan, lalu
+    singkatan/slang ("gmn", "brp", "dmn") diganti bentuk bakunya. Semua pola dikompilasi
+    sekali. Hasil per teks di-memo (dibatasi memo_size, hanya teks pendek) karena pesan yang
+    sama dinormalisasi beberapa kali per request (key cache, deteksi, batch); memo_size=0
+    mematikan memo. Memo tidak ikut dipickle ke artifact.
+    """
+
+    def __init__(self, slang: Optional[Dict[str, List[str]]] = None, memo_size: int = 10000, memo_max_length: int = 256):
+        self.memo_size = memo_size
+        self.memo_max_length = memo_max_length
+        self.slang: Dict[str, str] = {}
+        for canonical, variants in (slang or {}).items():
+            for variant in variants:
+                variant = " ".join(variant.lower().split())
+                if self.slang.get(variant, canonical) != canonical:
+                    raise ValueError(f"slang '{variant}' dipetakan ke '{self.slang[variant]}' dan '{canonical}'")
+                self.slang[variant] = canonical
+        # Varian terpanjang dicoba lebih dulu ("di mana" sebelum "di")
+        alternatives = "|".join(re.escape(variant) for variant in sorted(self.slang, key=len, reverse=True))
+        self._slang_pattern = re.compile(rf'(?<!\w)(?:{alternatives})(?!\w)') if self.slang else None
+        self._memo: Dict[str, NormalizedText] = {}
+
+    def __len__(self) -> int:
+        return len(self.slang)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_memo'] = {}
+        return state
+
+    def normalize(self, text: str) -> NormalizedText:
+        normalized = self._memo.get(text)
+        if normalized is not None:
+            return normalized
+        lowered = text.lower().strip()
+        prefix = lowered[0] if COMMAND_PATTERN.match(lowered) else ""
+        body = PUNCTUATION_PATTERN.sub(" ", lowered[len(prefix):])
+        body = " ".join(REPEATED_LETTER_PATTERN.sub(r'\1', body).split())
+        if self._slang_pattern is not None:
+            body = self._slang_pattern.sub(lambda match: self.slang[match.group(0)], body)
+        normalized = NormalizedText(prefix + body, tuple(WORD_PATTERN.findall(body)))
+        if self.memo_size > 0 and len(text) <= self.memo_max_length:
+            if len(self._memo) >= self.memo_size:
+                self._memo.clear()
+            self._memo[text] = normalized
+        return normalized
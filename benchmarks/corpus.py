@@ -0,0 +1,77 @@
+import glob
+import json
+import os
+import random
+import string
+from typing import Dict, List
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INTENTS_GLOB = os.path.join(BASE_DIR, "dialogflow_kianoland", "intents", "*.json")
+
+FILLER = [
+    "saya sudah lihat iklannya kemarin", "kebetulan saya kerja di bekasi", "mohon dibantu ya kak",
+    "rencananya buat keluarga", "kalau bisa secepatnya", "terima kasih sebelumnya",
+]
+
+
+def training_phrases() -> List[str]:
+    """Frasa pelatihan asli dari dialogflow_kianoland/intents/*.json"""
+    phrases = []
+    for filename in sorted(glob.glob(INTENTS_GLOB)):
+        with open(filename, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for phrase in data.get('trainingPhrases', []):
+            text = ''.join(part['text'] for part in phrase['parts']).strip()
+            if text:
+                phrases.append(text)
+    return phrases
+
+
+def add_typo(text: str, rng: random.Random) -> str:
+    """Satu typo acak: huruf tertukar, hilang, atau diganti"""
+    if len(text) < 4:
+        return text
+    i = rng.randrange(1, len(text) - 1)
+    kind = rng.choice(('swap', 'drop', 'replace'))
+    if kind == 'swap':
+        return text[:i - 1] + text[i] + text[i - 1] + text[i + 1:]
+    if kind == 'drop':
+        return text[:i] + text[i + 1:]
+    return text[:i] + rng.choice(string.ascii_lowercase) + text[i + 1:]
+
+
+def repeat_letters(text: str, rng: random.Random) -> str:
+    """Ulang satu huruf 3-6 kali ("halooo"), seperti gaya chat pengguna"""
+    letters = [i for i, ch in enumerate(text) if ch.isalpha()]
+    if not letters:
+        return text
+    i = rng.choice(letters)
+    return text[:i] + text[i] * rng.randint(3, 6) + text[i + 1:]
+
+
+def paragraph(phrases: List[str], rng: random.Random) -> str:
+    """Pesan panjang: beberapa frasa dan kalimat pengisi digabung jadi satu paragraf"""
+    parts = rng.sample(phrases, k=min(len(phrases), rng.randint(4, 8))) + rng.sample(FILLER, k=2)
+    rng.shuffle(parts)
+    return '. '.join(parts) + '.'
+
+
+def no_match(rng: random.Random) -> str:
+    """Kata acak tanpa kata kunci aturan, sehingga jatuh ke Rule #14 dan fallback"""
+    return ' '.join(
+        ''.join(rng.choice('bcdfgjlmnpqvwxz') for _ in range(rng.randint(3, 8)))
+        for _ in range(rng.randint(2, 6))
+    )
+
+
+def build_corpus(seed: int = 42, variants: int = 200) -> Dict[str, List[str]]:
+    """Korpus benchmark per kategori: phrases, typos, repeated, paragraphs, no_match"""
+    rng = random.Random(seed)
+    phrases = training_phrases()
+    return {
+        'phrases': phrases,
+        'typos': [add_typo(rng.choice(phrases).lower(), rng) for _ in range(variants)],
+        'repeated': [repeat_letters(rng.choice(phrases), rng) for _ in range(variants)],
+        'paragraphs': [paragraph(phrases, rng) for _ in range(variants // 4)],
+        'no_match': [no_match(rng) for _ in range(variants)],
+    }
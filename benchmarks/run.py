@@ -0,0 +1,213 @@
+"""Benchmark engine NLP dan endpoint HTTP.
+
+Contoh:
+    python -m benchmarks.run                                   # jalankan semua
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --tolerance 0.2
+
+Setiap baris hasil berisi ops/detik serta latensi p50/p95/p99 (mikrodetik). Dengan
+--baseline, p95 yang naik atau ops/detik yang turun melebihi --tolerance dianggap regresi
+dan proses keluar dengan kode 1. Angka bergantung mesin, jadi baseline tidak disimpan di
+repo: simpan baseline di mesin yang sama sebelum perubahan, lalu bandingkan sesudahnya.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+
+# Variabel Telegram diisi dummy agar integrasinya aktif tanpa .env; log dibuat senyap
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# Rate limit pesan keluar dimatikan: benchmark mengukur biaya aplikasi, bukan batas Bot API
+os.environ.setdefault("TELEGRAM_GLOBAL_RATE", "0")
+os.environ.setdefault("TELEGRAM_CHAT_RATE", "0")
+# Discord tidak dibutuhkan benchmark; Telegram tetap aktif untuk mengukur /telegram-webhook
+os.environ.setdefault("ENABLE_DISCORD", "false")
+for name, value in (("TELEGRAM_TOKEN", "bench"), ("TELEGRAM_WEBHOOK_URL", "http://localhost/telegram-webhook")):
+    os.environ.setdefault(name, value)
+
+from backend import local_nlp  # noqa: E402
+from backend.text_normalizer import Normalizer, load_slang  # noqa: E402
+from .corpus import build_corpus  # noqa: E402
+
+
+def summarize(durations: List[float]) -> Dict[str, float]:
+    """ops/detik dan persentil latensi (mikrodetik) dari daftar durasi per operasi (detik)"""
+    ordered = sorted(durations)
+    total = sum(ordered)
+
+    def percentile(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1e6, 1)
+
+    return {
+        "n": len(ordered),
+        "ops_per_sec": round(len(ordered) / total, 1) if total else 0.0,
+        "p50_us": percentile(0.50),
+        "p95_us": percentile(0.95),
+        "p99_us": percentile(0.99),
+    }
+
+
+def time_calls(func: Callable, inputs: List[str], repeat: int) -> List[float]:
+    for text in inputs[:200]:  # pemanasan (cache lru, alokasi awal) sebelum diukur
+        func(text)
+    durations = []
+    perf_counter = time.perf_counter
+    for _ in range(repeat):
+        for text in inputs:
+            started = perf_counter()
+            func(text)
+            durations.append(perf_counter() - started)
+    return durations
+
+
+def time_batches(func: Callable, inputs: List[str], size: int, repeat: int) -> List[float]:
+    """Durasi per item (dirata-rata per batch) untuk func yang menerima daftar input sekaligus"""
+    func(inputs[:size])  # pemanasan
+    durations = []
+    perf_counter = time.perf_counter
+    for _ in range(repeat):
+        for offset in range(0, len(inputs), size):
+            batch = inputs[offset:offset + size]
+            started = perf_counter()
+            func(batch)
+            durations.extend([(perf_counter() - started) / len(batch)] * len(batch))
+    return durations
+
+
+def bench_engine(corpus: Dict[str, List[str]], repeat: int) -> Dict[str, Dict[str, float]]:
+    """Tiap tahap deteksi secara terpisah + deteksi penuh per kategori korpus"""
+    everything = [text for texts in corpus.values() for text in texts]
+    normalized = [local_nlp.normalize_input(text) for text in everything]
+    # Normalizer model memakai memo; stage.normalize diukur tanpa memo agar pola benar-benar dijalankan
+    uncached = Normalizer(load_slang(os.path.join(local_nlp.DIALOGFLOW_FOLDER, local_nlp.SLANG_FILE)), memo_size=0)
+    results = {
+        "stage.normalize": summarize(time_calls(uncached.normalize, everything, repeat)),
+        "stage.normalize_memo": summarize(time_calls(local_nlp.normalize_input, everything, repeat)),
+        "stage.entities": summarize(time_calls(local_nlp.detect_entities, normalized, repeat)),
+        "stage.rule_keywords": summarize(time_calls(local_nlp.match_rule_keywords, normalized, repeat)),
+        "stage.similarity": summarize(time_calls(local_nlp.find_similar_phrase, normalized, repeat)),
+    }
+    classifier = local_nlp.MODEL.classifier
+    if classifier is not None:  # butuh numpy
+        results["stage.ngram"] = summarize(time_calls(classifier.classify, normalized, repeat))
+        results["stage.ngram_batch256"] = summarize(time_batches(classifier.classify_batch, normalized, 256, repeat))
+    for category, texts in corpus.items():
+        # classify_intent tidak memakai cache, jadi ini mengukur jalur cache miss
+        results[f"detect.{category}"] = summarize(time_calls(local_nlp.classify_intent, texts, repeat))
+    results["detect.all"] = summarize(time_calls(local_nlp.classify_intent, everything, repeat))
+
+    local_nlp.RESPONSE_CACHE.clear()
+    time_calls(local_nlp.classify_cached, everything, 1)
+    results["detect.cached"] = summarize(time_calls(local_nlp.classify_cached, everything, repeat))
+    return results
+
+
+async def _bench_endpoints(corpus: Dict[str, List[str]], repeat: int) -> Dict[str, Dict[str, float]]:
+    import httpx
+    from backend import app as app_module
+
+    # Tanpa lifespan (bot Discord & setWebhook tidak dijalankan); Bot API Telegram diganti
+    # transport lokal sehingga yang terukur hanya biaya di sisi aplikasi
+    app_module.telegram_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, json={"ok": True, "result": True}))
+    )
+    app_module.nlp_executor.start()
+    everything = [text for texts in corpus.values() for text in texts]
+    results = {}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app_module.app), base_url="http://bench") as client:
+            endpoints = {
+                "http.chat": lambda i, text: client.post("/chat", json={"user_input": text}),
+                "http.telegram_webhook": lambda i, text: client.post(
+                    "/telegram-webhook", json={"update_id": i, "message": {"chat": {"id": 1000 + i % 50}, "text": text}}
+                ),
+            }
+            for name, request in endpoints.items():
+                local_nlp.RESPONSE_CACHE.clear()
+                durations = []
+                for _ in range(repeat):
+                    for i, text in enumerate(everything):
+                        started = time.perf_counter()
+                        response = await request(i, text)
+                        durations.append(time.perf_counter() - started)
+                        response.raise_for_status()
+                results[name] = summarize(durations)
+    finally:
+        app_module.nlp_executor.shutdown()
+        await app_module.telegram_client.aclose()
+    return results
+
+
+def bench_endpoints(corpus: Dict[str, List[str]], repeat: int) -> Dict[str, Dict[str, float]]:
+    return asyncio.run(_bench_endpoints(corpus, repeat))
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Daftar regresi dibanding baseline (p95 naik / ops per detik turun lebih dari tolerance)"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if current["p95_us"] > previous["p95_us"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_us']}us -> {current['p95_us']}us")
+        if current["ops_per_sec"] < previous["ops_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: ops/s {previous['ops_per_sec']} -> {current['ops_per_sec']}")
+    return regressions
+
+
+def print_table(results: Dict[str, dict], baseline: Dict[str, dict]):
+    print(f"{'benchmark':<26}{'n':>8}{'ops/s':>12}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}{'vs base':>10}")
+    for name, row in results.items():
+        change = ""
+        if name in baseline and baseline[name]["ops_per_sec"]:
+            change = f"{(row['ops_per_sec'] / baseline[name]['ops_per_sec'] - 1) * 100:+.1f}%"
+        print(f"{name:<26}{row['n']:>8}{row['ops_per_sec']:>12}{row['p50_us']:>10}{row['p95_us']:>10}{row['p99_us']:>10}{change:>10}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark NLP engine & endpoint Kianoland ChatBot")
+    parser.add_argument("--only", choices=("engine", "http"), help="jalankan salah satu grup saja")
+    parser.add_argument("--repeat", type=int, default=3, help="jumlah putaran korpus per benchmark engine")
+    parser.add_argument("--http-repeat", type=int, default=1, help="jumlah putaran korpus per endpoint")
+    parser.add_argument("--variants", type=int, default=200, help="jumlah variasi sintetis per kategori")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", help="file JSON baseline untuk dibandingkan")
+    parser.add_argument("--save-baseline", help="simpan hasil sebagai baseline baru")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="batas regresi relatif (0.2 = 20%%)")
+    parser.add_argument("--json", action="store_true", help="cetak hasil sebagai JSON")
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(seed=args.seed, variants=args.variants)
+    results: Dict[str, dict] = {}
+    if args.only in (None, "engine"):
+        results.update(bench_engine(corpus, args.repeat))
+    if args.only in (None, "http"):
+        results.update(bench_endpoints(corpus, args.http_repeat))
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)["results"]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results, baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({"python": sys.version.split()[0], "seed": args.seed, "results": results}, f, indent=2)
+        print(f"✅ Baseline disimpan ke {args.save_baseline}")
+
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"⚠️  Regresi: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
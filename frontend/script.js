@@ -2,6 +2,19 @@ const messageContainer = document.getElementById('messages');
 const userInput = document.getElementById('user-input');
 const sendButton = document.getElementById('send-button');
 
+// ID sesi per tab browser agar backend bisa mengingat konteks percakapan (proyek yang sedang dibahas)
+function getSessionId() {
+    let sessionId = sessionStorage.getItem('kianoland-session-id');
+    if (!sessionId) {
+        sessionId = (window.crypto && crypto.randomUUID)
+            ? crypto.randomUUID()
+            : Date.now().toString(36) + Math.random().toString(36).slice(2);
+        sessionStorage.setItem('kianoland-session-id', sessionId);
+    }
+    return sessionId;
+}
+const sessionId = getSessionId();
+
 // Fungsi untuk mendapatkan waktu dalam format jam:menit AM/PM
 function getCurrentTime() {
     const now = new Date();
@@ -66,12 +79,52 @@ function handleRichResponse(response) {
     }
 }
 
+// Koneksi WebSocket ke /ws/chat: fragmen balasan ditampilkan begitu diterima.
+// Jika koneksi belum/tidak tersedia, pesan dikirim lewat POST /chat seperti biasa.
+let chatSocket = null;
+let reconnectDelay = 1000;
+let nextMessageId = 1;
+
+function connectChatSocket() {
+    if (!('WebSocket' in window) || !location.host) return;
+    const protocol = location.protocol === 'https:' ? 'wss://' : 'ws://';
+    const socket = new WebSocket(`${protocol}${location.host}/ws/chat?session_id=${encodeURIComponent(sessionId)}`);
+
+    socket.addEventListener('open', () => {
+        chatSocket = socket;
+        reconnectDelay = 1000;
+    });
+    socket.addEventListener('message', (event) => {
+        const data = JSON.parse(event.data);
+        if (data.type === 'fragment') {
+            if (data.text.trim()) { // Pastikan pesan tidak kosong
+                addBotMessage(data.text.trim());
+            }
+        } else if (data.type === 'error') {
+            console.error('Error:', data);
+            addBotMessage("Maaf, terjadi kesalahan saat memproses permintaan Anda.");
+        }
+    });
+    socket.addEventListener('close', () => {
+        chatSocket = null;
+        // Sambung ulang dengan jeda yang makin panjang (maksimal 30 detik)
+        setTimeout(connectChatSocket, reconnectDelay);
+        reconnectDelay = Math.min(reconnectDelay * 2, 30000);
+    });
+}
+connectChatSocket();
+
 // Fungsi utama untuk menangani respons dari server
 async function sendMessage() {
     const message = userInput.value.trim();
     if (message) {
         addUserMessage(message);
         userInput.value = '';
+
+        if (chatSocket && chatSocket.readyState === WebSocket.OPEN) {
+            chatSocket.send(JSON.stringify({ user_input: message, id: nextMessageId++ }));
+            return;
+        }
         
         try {
             const response = await fetch('/chat', {
@@ -80,7 +133,8 @@ async function sendMessage() {
                     'Content-Type': 'application/json',
                 },
                 body: JSON.stringify({ 
-                    user_input: message
+                    user_input: message,
+                    session_id: sessionId
                 })
             });
             
@@ -0,0 +1,88 @@
+"""Regresi tabel aturan (dialogflow_kianoland/rules.json).
+
+Mengunci urutan prioritas ATURAN: setiap id aturan punya minimal satu contoh input dengan
+(rule, intent) yang diharapkan, sehingga perubahan urutan atau kondisi di rules.json yang
+menggeser hasil deteksi langsung ketahuan.
+"""
+import json
+import shutil
+
+import pytest
+
+from backend import local_nlp
+
+CASES = [
+    ("!info", "0", "daftar_proyek"),
+    ("kontak", "1", "info_kontak"),
+    ("mau beli rumah", "2", "minat_beli"),
+    ("syarat", "3", "syarat_dokumen"),
+    ("bantuan", "4", "bantuan"),
+    ("daftar proyek", "5", "daftar_proyek"),
+    ("halo", "6", "welcome"),
+    ("kiano 9", "7A", None),
+    ("kiano 1", "7B", None),
+    ("kiano dua", "7B", None),
+    ("kiano 3 mezzanine", "7C", "info_proyek"),
+    ("cicilan 40/60 kiano 3", "7C", "info_proyek"),
+    ("harga kiano 3", "7C", "info_harga"),
+    ("fasilitas kiano 3", "7C", "info_fasilitas"),
+    ("lokasi jonggol village", "7C", "info_lokasi"),
+    ("kiano 3", "7D", "info_proyek"),
+    ("green jonggol", "7D", "info_proyek"),
+    ("harga", "8", None),
+    ("lokasi", "9", None),
+    ("alamat kantor", "9", None),
+    ("fasilitas", "10", None),
+    ("diskon", "11", "info_promo"),
+    ("subsidi", "12", "info_proyek"),
+    ("komersil", "12", "info_proyek"),
+    ("rekomendasi cibarusah", "13A", "rekomendasi_proyek"),
+    ("rekomendasi", "13B", "daftar_proyek"),
+    ("kiano", "14", "info_proyek"),
+    ("zzzz qwrty", "15", "default_fallback"),
+]
+
+
+@pytest.fixture(scope="module")
+def model():
+    # Dibangun langsung dari JSON (bukan artifact) agar yang diuji adalah rules.json saat ini
+    return local_nlp.build_model()
+
+
+@pytest.fixture(autouse=True)
+def rules_engine(monkeypatch):
+    # Engine ngram/hybrid mengubah hasil ATURAN #14 dan mendahului sebagian tabel
+    monkeypatch.setattr(local_nlp, "NLP_ENGINE", "rules")
+
+
+@pytest.mark.parametrize("text, rule, intent", CASES)
+def test_rule_priority(model, text, rule, intent):
+    detection = local_nlp.classify_intent(text, model)
+    assert (detection.rule, detection.intent) == (rule, intent)
+
+
+def test_every_rule_id_covered(model):
+    covered = {rule for _, rule, _ in CASES}
+    assert {rule.id for rule in model.rules.rules} <= covered
+
+
+def _data_folder_with_rule(tmp_path, rule: dict) -> str:
+    folder = tmp_path / "dialogflow_kianoland"
+    shutil.copytree(local_nlp.DIALOGFLOW_FOLDER, folder)
+    path = folder / local_nlp.RULES_FILE
+    table = json.loads(path.read_text(encoding="utf-8"))
+    table["rules"].insert(0, rule)
+    path.write_text(json.dumps(table), encoding="utf-8")
+    return str(folder)
+
+
+def test_unknown_keyword_group_fails_build(tmp_path):
+    folder = _data_folder_with_rule(tmp_path, {"id": "X", "when": {"any_keywords": ["tidak_ada"]}, "intent": "welcome"})
+    with pytest.raises(ValueError, match="grup kata kunci tidak ada"):
+        local_nlp.build_model(folder)
+
+
+def test_unknown_intent_fails_build(tmp_path):
+    folder = _data_folder_with_rule(tmp_path, {"id": "X", "when": {"any_keywords": ["welcome"]}, "intent": "tidak_ada"})
+    with pytest.raises(ValueError, match="intent 'tidak_ada' tidak ada"):
+        local_nlp.build_model(folder)